@@ -1,16 +1,33 @@
 #!/usr/bin/env python3
 import argparse
+import csv
+import heapq
+import json
+import os
 import subprocess
 import sys
+from collections import OrderedDict
 from dataclasses import dataclass
-from itertools import chain
+from itertools import chain, islice
 from pathlib import Path
-from typing import Dict, Iterable, List, Literal, Optional, Tuple
+from typing import IO, Any, Dict, Iterable, Iterator, List, Literal, Optional, TextIO, Tuple, Union
+
+
+READ_SIZE = 1 << 16
+"""The number of bytes read from git's output at a time"""
+
+CHUNK_SIZE = 4096
+"""The number of diff records whose blob sizes are looked up together"""
+
+RENAME_DETECTION_ARGS = ["-M", "-C"]
+"""The `git diff-tree` options that pair renamed and copied files with their source"""
 
 
 @dataclass
 class GitDiffTreeRecord:
-    """Represents a line of output from 'git diff-tree'"""
+    """Represents a record of output from 'git diff-tree'"""
+
+    __slots__ = ("src_mode", "src_hash", "dst_mode", "dst_hash", "src_path", "dst_path", "status", "score")
 
     src_mode: str
     src_hash: str
@@ -21,33 +38,207 @@ class GitDiffTreeRecord:
     status: Literal["A", "C", "D", "M", "R", "T", "U", "X"]
     score: Optional[int]
 
+    @property
+    def path(self) -> Path:
+        """The path of the file after the change (its destination, for a rename or copy)"""
+        return self.dst_path or self.src_path
+
 
 @dataclass
 class GitChange:
+    __slots__ = ("diff_record", "bytes_changed")
+
     diff_record: GitDiffTreeRecord
     bytes_changed: int
 
 
-def parse_git_diff_tree_output(output: str) -> List[GitDiffTreeRecord]:
-    """Parses the output of `git diff-tree` as described in the "Raw Output" section
+def iter_nul_separated(args: List[str], stdin: Union[int, IO[bytes], None] = None) -> Iterator[str]:
+    """Runs a command and lazily yields the NUL separated fields it writes to stdout
+
+    The command is started straight away, rather than on the first read.
+
+    :param args: The command
+    :type args: List[str]
+    :param stdin: The command's stdin, as accepted by `subprocess.Popen`
+    :type stdin: Union[int, IO[bytes], None]
+
+    :return: The fields, as they are read
+    :rtype: Iterator[str]
+    """
+    process = subprocess.Popen(args, stdin=stdin, stdout=subprocess.PIPE)
+
+    def read_fields() -> Iterator[str]:
+        with process:
+            assert process.stdout is not None
+            pending = b""
+
+            for chunk in iter(lambda: process.stdout.read1(READ_SIZE), b""):
+                *fields, pending = (pending + chunk).split(b"\0")
+                for field in fields:
+                    yield os.fsdecode(field)
+
+            if process.wait() != 0:
+                raise subprocess.CalledProcessError(process.returncode, args)
+
+            if pending:
+                yield os.fsdecode(pending)
+
+    return read_fields()
+
+
+def parse_git_diff_tree_output(fields: Iterable[str]) -> Iterator[Union[str, GitDiffTreeRecord]]:
+    """Parses the output of `git diff-tree -z` as described in the "Raw Output" section
     of the man page
+
+    :param fields: The NUL separated fields of the output
+    :type fields: Iterable[str]
+
+    :return: The records of the diff, as they are parsed. When diffing commits read from stdin,
+        the name of each commit is yielded before its records.
+    :rtype: Iterator[Union[str, GitDiffTreeRecord]]
     """
+    fields = iter(fields)
+
+    for field in fields:
+        if not field.startswith(":"):
+            yield field
+            continue
+
+        src_mode, dst_mode, src_hash, dst_hash, status_and_score = field[1:].split(" ")
+        src_path = Path(next(fields))
+        # Only copies and renames have both a source and a destination path
+        dst_path = Path(next(fields)) if status_and_score[0] in "CR" else None
 
-    def make_record(line: str) -> GitDiffTreeRecord:
-        src_mode, dst_mode, src_hash, dst_hash, rest = line[1:].split(" ", maxsplit=4)
-        status_score_and_paths = rest.split("\t")
-        return GitDiffTreeRecord(
+        yield GitDiffTreeRecord(
             src_mode=src_mode,
             src_hash=src_hash,
             dst_mode=dst_mode,
             dst_hash=dst_hash,
-            status=status_score_and_paths[0][0],
-            score=int(status_score_and_paths[0][1:]) if len(status_score_and_paths[0]) > 1 else None,
-            src_path=Path(status_score_and_paths[1]),
-            dst_path=Path(status_score_and_paths[2]) if len(status_score_and_paths) >= 3 else None,
+            status=status_and_score[0],  # type: ignore[arg-type]
+            score=int(status_and_score[1:]) if len(status_and_score) > 1 else None,
+            src_path=src_path,
+            dst_path=dst_path,
+        )
+
+
+class GitObjectSizes:
+    """Looks up the sizes of git objects through a single long-lived `git cat-file --batch-check` process
+
+    Object names are written to the process in batches and each batch's responses are read back
+    before the next one is written, so neither pipe fills up and no output is buffered beyond a
+    batch. The most recently used sizes are memoized, so an object that shows up again (e.g. the
+    new blob of a file that a later commit changes) usually isn't asked about twice.
+
+    Use as a context manager, or call `close` when done.
+    """
+
+    DISK_FORMAT = "%(objectname) %(objecttype) %(objectsize:disk)"
+    """The `--batch-check` format that reports the size objects take up in the object store"""
+
+    BATCH_SIZE = 256
+    """The number of object names written before their responses are read back"""
+
+    MEMO_SIZE = 1 << 16
+    """The number of sizes kept in memory"""
+
+    def __init__(self, cwd: Optional[Path] = None, disk: bool = False) -> None:
+        """
+        :param cwd: A directory in the repository. Defaults to the current working directory.
+        :type cwd: Optional[Path]
+        :param disk: Whether to look up the size objects take up on disk (compressed, and for packed
+            objects, deltified), rather than their size when uncompressed
+        :type disk: bool
+        """
+        self.disk = disk
+        self.args = ["git", "cat-file", f"--batch-check={self.DISK_FORMAT}" if disk else "--batch-check"]
+        self.process = subprocess.Popen(
+            self.args,
+            cwd=cwd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
         )
+        self.sizes: "OrderedDict[str, Optional[int]]" = OrderedDict()
+
+    def __enter__(self) -> "GitObjectSizes":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Ends the `cat-file` process"""
+        if self.process.stdin is not None and not self.process.stdin.closed:
+            self.process.stdin.close()
+        self.process.wait()
+        if self.process.stdout is not None:
+            self.process.stdout.close()
+
+    def get_sizes(self, hashes: Iterable[str]) -> Dict[str, Optional[int]]:
+        """Fetches the sizes, in bytes, of git objects
+
+        :param hashes: A iterable of git object hashes
+        :type hashes: Iterable[str]
+
+        :return: A dictionary that mapping hashes to their size if the object exists,
+                 or None otherwise
+        :rtype: Dict[str, Optional[int]]
+        """
+        sizes: Dict[str, Optional[int]] = {}
+        batch: List[str] = []
+
+        for hash in hashes:
+            if hash in sizes:
+                continue
+
+            if hash in self.sizes:
+                self.sizes.move_to_end(hash)
+                sizes[hash] = self.sizes[hash]
+                continue
+
+            # The all-zero "hash" of the missing side of an added or deleted file is never asked about
+            sizes[hash] = None
+            if is_null_hash(hash):
+                continue
+
+            batch.append(hash)
+            if len(batch) == self.BATCH_SIZE:
+                sizes.update(self._query(batch))
+                batch = []
+
+        if batch:
+            sizes.update(self._query(batch))
+
+        return sizes
+
+    def _query(self, batch: List[str]) -> Iterator[Tuple[str, Optional[int]]]:
+        """Writes a batch of object names to `cat-file` and reads back their sizes"""
+        assert self.process.stdin is not None and self.process.stdout is not None
+        try:
+            self.process.stdin.write("".join(f"{hash}\n" for hash in batch))
+            self.process.stdin.flush()
+        except BrokenPipeError as e:
+            raise subprocess.CalledProcessError(self.process.wait(), self.args) from e
+
+        for hash in batch:
+            line = self.process.stdout.readline()
+            if not line:
+                raise subprocess.CalledProcessError(self.process.wait(), self.args)
 
-    return [make_record(line) for line in output.splitlines(keepends=False)]
+            # "<oid> <type> <size>", or "<name> missing" (or "ambiguous")
+            fields = line.split()
+            size = int(fields[-1]) if len(fields) == 3 else None
+
+            self.sizes[hash] = size
+            if len(self.sizes) > self.MEMO_SIZE:
+                self.sizes.popitem(last=False)
+
+            yield hash, size
+
+
+def is_null_hash(hash: str) -> bool:
+    """Whether a hash is git's all-zero object name"""
+    return not hash.strip("0")
 
 
 def get_blob_sizes(hashes: Iterable[str]) -> Dict[str, Optional[int]]:
@@ -60,55 +251,313 @@ def get_blob_sizes(hashes: Iterable[str]) -> Dict[str, Optional[int]]:
              or None otherwise
     :rtype: Dict[str, Optional[int]]
     """
-    input = "\n".join(set(hashes))
-    cat_file_output = subprocess.run(
-        ["git", "cat-file", "--batch-check"],
-        input=input,
-        check=True,
-        text=True,
-        capture_output=True,
-    ).stdout
+    with GitObjectSizes() as object_sizes:
+        return object_sizes.get_sizes(hashes)
 
-    def make_object_size_tuple(line: str) -> Tuple[str, Optional[int]]:
-        hash, *_, size = line.split()
-        return (hash, int(size) if size != "missing" else None)
 
-    return dict(make_object_size_tuple(line) for line in cat_file_output.splitlines(keepends=False))
-
-
-def get_file_size_differences(commit_range: str) -> Dict[Path, GitChange]:
+def get_file_size_differences(
+    commit_range: str, renames: bool = True, measure: Literal["raw", "packed"] = "raw"
+) -> Dict[Path, GitChange]:
     """Computes the size difference, in bytes, of files changed between two commits
 
     :param commit_range: A git commit range (e.g. HEAD~3..HEAD)
     :type commit_range: str
+    :param renames: Whether to detect renamed and copied files
+    :type renames: bool
+    :param measure: "raw" to measure files by their size, or "packed" to measure the objects a
+        change adds by the size they take up in the object store (see `iter_size_changes`)
+    :type measure: Literal["raw", "packed"]
 
     :return: A dictionary mapping paths (relative to repository root) to size
         differences.
     :rtype: dict[Path, GitChange]
     """
-    changed_records = parse_git_diff_tree_output(
-        subprocess.run(
-            ["git", "diff-tree", "-r", commit_range],
-            capture_output=True,
-            text=True,
-            check=True,
-        ).stdout
-    )
+    return dict(iter_file_size_differences(commit_range, renames, measure))
+
+
+def iter_file_size_differences(
+    commit_range: str, renames: bool = True, measure: Literal["raw", "packed"] = "raw"
+) -> Iterator[Tuple[Path, GitChange]]:
+    """Lazily computes the size difference, in bytes, of files changed between two commits
+
+    :param commit_range: A git commit range (e.g. HEAD~3..HEAD)
+    :type commit_range: str
+    :param renames: Whether to detect renamed and copied files
+    :type renames: bool
+    :param measure: "raw" to measure files by their size, or "packed" to measure the objects a
+        change adds by the size they take up in the object store (see `iter_size_changes`)
+    :type measure: Literal["raw", "packed"]
+
+    :return: The paths (relative to repository root) and size differences of the files,
+        as they are read from git
+    :rtype: Iterator[Tuple[Path, GitChange]]
+    """
+    args = ["git", "diff-tree", "-r", "-z", *(RENAME_DETECTION_ARGS if renames else []), commit_range]
+    fields = iter_nul_separated(args)
+    changed_records = (x for x in parse_git_diff_tree_output(fields) if isinstance(x, GitDiffTreeRecord))
 
-    sizes = get_blob_sizes(chain.from_iterable((idx.src_hash, idx.dst_hash) for idx in changed_records))
+    with GitObjectSizes(disk=measure == "packed") as object_sizes:
+        yield from iter_size_changes(changed_records, object_sizes)
 
-    assert {"A", "D", "M"}.issuperset(idx.status for idx in changed_records)
+
+def iter_size_changes(
+    changed_records: Iterable[GitDiffTreeRecord], object_sizes: GitObjectSizes
+) -> Iterator[Tuple[Path, GitChange]]:
+    """Computes the size difference, in bytes, of each file in a diff
+
+    Every record is counted as the size of its destination blob less the size of its source
+    blob, either of which is missing for an added or deleted file. A renamed file is therefore
+    counted by how much it changed rather than as a whole addition and deletion, and a copied file
+    by how much it differs from the file it was copied from, which is what git stores once the copy
+    is delta compressed against it.
+
+    When the sizes are looked up on disk, records are instead counted as what they add to the
+    object store: the compressed (and, once packed, deltified) size of the destination blob, or
+    nothing when the blob is unchanged or removed. This approximates what a clone or fetch has to
+    transfer. Objects that haven't been packed yet, e.g. those of local commits, are only zlib
+    compressed, so they are measured larger than they would be in a pack.
+
+    Records are consumed, and their blob sizes looked up, `CHUNK_SIZE` at a time.
+
+    :param changed_records: The records of the diff
+    :type changed_records: Iterable[GitDiffTreeRecord]
+    :param object_sizes: The service to look up blob sizes with
+    :type object_sizes: GitObjectSizes
+
+    :return: The paths (relative to repository root) of the files after the change, and their
+        size differences
+    :rtype: Iterator[Tuple[Path, GitChange]]
+    """
 
     def as_int(maybe_num: Optional[int]) -> int:
         return maybe_num or 0
 
-    return {
-        x.src_path: GitChange(
-            diff_record=x,
-            bytes_changed=as_int(sizes[x.dst_hash]) - as_int(sizes[x.src_hash]),
-        )
-        for x in changed_records
-    }
+    changed_records = iter(changed_records)
+
+    for chunk in iter(lambda: list(islice(changed_records, CHUNK_SIZE)), []):
+        if object_sizes.disk:
+            sizes = object_sizes.get_sizes(idx.dst_hash for idx in chunk if idx.dst_hash != idx.src_hash)
+
+            for x in chunk:
+                yield x.path, GitChange(diff_record=x, bytes_changed=as_int(sizes.get(x.dst_hash)))
+            continue
+
+        sizes = object_sizes.get_sizes(chain.from_iterable((idx.src_hash, idx.dst_hash) for idx in chunk))
+
+        for x in chunk:
+            yield x.path, GitChange(
+                diff_record=x,
+                bytes_changed=as_int(sizes[x.dst_hash]) - as_int(sizes[x.src_hash]),
+            )
+
+
+@dataclass
+class CommitSizeChange:
+    """The size differences introduced by a single commit"""
+
+    commit: str
+    changes: Dict[Path, GitChange]
+
+    @property
+    def bytes_changed(self) -> int:
+        return sum(x.bytes_changed for x in self.changes.values())
+
+
+def get_commit_size_changes(
+    commit_range: str, renames: bool = True, measure: Literal["raw", "packed"] = "raw"
+) -> Iterator[CommitSizeChange]:
+    """Computes the size differences introduced by each commit in a range, oldest first
+
+    `git rev-list` is piped straight into a single `git diff-tree --stdin`, which diffs each commit
+    against its parent, and all blob sizes are looked up through one `cat-file` process. Merge
+    commits are reported without changes, since what they bring in is already attributed to the
+    merged commits.
+
+    :param commit_range: A git commit range (e.g. HEAD~3..HEAD)
+    :type commit_range: str
+    :param renames: Whether to detect renamed and copied files
+    :type renames: bool
+    :param measure: "raw" to measure files by their size, or "packed" to measure the objects a
+        change adds by the size they take up in the object store (see `iter_size_changes`)
+    :type measure: Literal["raw", "packed"]
+
+    :return: The size differences of each commit, as they are read from git
+    :rtype: Iterator[CommitSizeChange]
+    """
+    rev_list_args = ["git", "rev-list", "--reverse", commit_range]
+    diff_tree_args = ["git", "diff-tree", "--stdin", "--always", "--root", "-r", "-z"]
+    if renames:
+        diff_tree_args.extend(RENAME_DETECTION_ARGS)
+
+    object_sizes = GitObjectSizes(disk=measure == "packed")
+
+    with subprocess.Popen(rev_list_args, stdout=subprocess.PIPE) as rev_list, object_sizes:
+        assert rev_list.stdout is not None
+        fields = iter_nul_separated(diff_tree_args, stdin=rev_list.stdout)
+        # Only diff-tree should hold the read end, so rev-list gets SIGPIPE if diff-tree exits
+        rev_list.stdout.close()
+
+        commit: Optional[str] = None
+        records: List[GitDiffTreeRecord] = []
+
+        for x in parse_git_diff_tree_output(fields):
+            if isinstance(x, GitDiffTreeRecord):
+                records.append(x)
+                continue
+
+            if commit is not None:
+                yield CommitSizeChange(commit, dict(iter_size_changes(records, object_sizes)))
+
+            commit = x
+            records = []
+
+        if commit is not None:
+            yield CommitSizeChange(commit, dict(iter_size_changes(records, object_sizes)))
+
+        if rev_list.wait() != 0:
+            raise subprocess.CalledProcessError(rev_list.returncode, rev_list_args)
+
+
+def write_timeline(commit_changes: Iterable[CommitSizeChange], format: Literal["json", "csv"], out: TextIO) -> int:
+    """Writes the size differences of each commit, and of each file in it
+
+    :param commit_changes: The size differences of each commit
+    :type commit_changes: Iterable[CommitSizeChange]
+    :param format: "json" for an array with an object per commit, or "csv" for a row per file per commit
+    :type format: Literal["json", "csv"]
+    :param out: The stream to write to
+    :type out: TextIO
+
+    :return: The sum of the size differences of all commits
+    :rtype: int
+    """
+    total = 0
+
+    if format == "csv":
+        writer = csv.writer(out)
+        writer.writerow(["commit", "path", "bytes_changed"])
+    else:
+        out.write("[")
+
+    for i, commit_change in enumerate(commit_changes):
+        total += commit_change.bytes_changed
+
+        if format == "csv":
+            writer.writerows(
+                [commit_change.commit, path.as_posix(), x.bytes_changed] for path, x in commit_change.changes.items()
+            )
+            continue
+
+        # One object per line, written as soon as the commit is diffed
+        entry = {
+            "commit": commit_change.commit,
+            "bytes_changed": commit_change.bytes_changed,
+            "files": {path.as_posix(): x.bytes_changed for path, x in commit_change.changes.items()},
+        }
+        out.write(("," if i else "") + "\n" + json.dumps(entry))
+
+    if format != "csv":
+        out.write("\n]\n")
+
+    return total
+
+
+class DirectoryRollup:
+    """The size differences of the files in a directory, including those in its subdirectories"""
+
+    __slots__ = ("bytes_changed", "files", "children")
+
+    def __init__(self) -> None:
+        self.bytes_changed = 0
+        self.files = 0
+        self.children: Dict[str, DirectoryRollup] = {}
+
+    def add(self, path: Path, bytes_changed: int) -> None:
+        """Adds the size difference of a file to this directory and to each directory on the way to it
+
+        :param path: The path of the file, relative to this directory
+        :type path: Path
+        :param bytes_changed: The size difference of the file
+        :type bytes_changed: int
+        """
+        node = self
+        node.bytes_changed += bytes_changed
+        node.files += 1
+
+        for part in path.parent.parts:
+            child = node.children.get(part)
+            if child is None:
+                child = node.children[part] = DirectoryRollup()
+
+            node = child
+            node.bytes_changed += bytes_changed
+            node.files += 1
+
+    def largest_children(self, n: int) -> List[Tuple[str, "DirectoryRollup"]]:
+        """Gets the subdirectories with the largest size differences, largest first
+
+        Subdirectories whose changes are all in a single subdirectory of their own are collapsed
+        into it, e.g. `samples/microsoft/python`.
+
+        :param n: The number of subdirectories to get
+        :type n: int
+
+        :return: The names (relative to this directory) and rollups of the subdirectories
+        :rtype: List[Tuple[str, DirectoryRollup]]
+        """
+        largest = heapq.nlargest(n, self.children.items(), key=lambda x: x[1].bytes_changed)
+        collapsed = []
+
+        for name, node in largest:
+            while len(node.children) == 1:
+                child_name, child = next(iter(node.children.items()))
+                if child.files != node.files:
+                    break
+                name, node = f"{name}/{child_name}", child
+
+            collapsed.append((name, node))
+
+        return collapsed
+
+    def to_json(self, path: str, n: int, depth: int) -> Dict[str, Any]:
+        """Gets the rollup as a JSON-serializable object
+
+        :param path: The path of this directory
+        :type path: str
+        :param n: The number of the largest subdirectories to include at each level
+        :type n: int
+        :param depth: The number of levels of subdirectories to include
+        :type depth: int
+
+        :rtype: Dict[str, Any]
+        """
+        return {
+            "path": path,
+            "bytes_changed": self.bytes_changed,
+            "files": self.files,
+            "subdirectories": [
+                child.to_json(name if path == "." else f"{path}/{name}", n, depth - 1)
+                for name, child in (self.largest_children(n) if depth > 0 else [])
+            ],
+        }
+
+    def tree_lines(self, n: int, depth: int, indent: str = "") -> Iterator[str]:
+        """Gets the lines of the rollup of the largest subdirectories, as an indented tree
+
+        :param n: The number of the largest subdirectories to include at each level
+        :type n: int
+        :param depth: The number of levels of subdirectories to include
+        :type depth: int
+
+        :rtype: Iterator[str]
+        """
+        if depth <= 0:
+            return
+
+        for name, child in self.largest_children(n):
+            files = f"{child.files} file" + ("s" if child.files != 1 else "")
+            yield f"\t{bytes_diff(child.bytes_changed)}\t{indent}{name}/ ({files})"
+            yield from child.tree_lines(n, depth - 1, indent + "  ")
 
 
 def main(
@@ -116,29 +565,70 @@ def main(
     quiet: bool = False,
     limit: Optional[int] = None,
     show_n_largest_files: int = 30,
+    timeline: Optional[Literal["json", "csv"]] = None,
+    no_renames: bool = False,
+    measure: Literal["raw", "packed"] = "raw",
+    rollup: Optional[Literal["tree", "json"]] = None,
+    rollup_top: int = 5,
+    rollup_depth: int = 3,
 ) -> Literal[0, 1]:
-    size_differences = get_file_size_differences(commit_range)
-    cumulative_size_difference = sum(x.bytes_changed for x in size_differences.values())
+    if timeline is not None:
+        # The limit applies to the sum of the commits' differences, which leaves out merges
+        commit_changes = get_commit_size_changes(commit_range, renames=not no_renames, measure=measure)
+        if quiet:
+            total = sum(x.bytes_changed for x in commit_changes)
+        else:
+            total = write_timeline(commit_changes, timeline, sys.stdout)
+        return 1 if limit is not None and total > limit else 0
+
+    # Only the largest differences are kept, in a min-heap keyed by size and then by reverse order
+    # of appearance, so ties are listed in the order git reports them
+    cumulative_size_difference = 0
+    largest_n_heap: List[Tuple[int, int, Path, GitChange]] = []
+    directories = DirectoryRollup()
+    size_differences = iter_file_size_differences(commit_range, renames=not no_renames, measure=measure)
+
+    for i, (path, change) in enumerate(size_differences):
+        cumulative_size_difference += change.bytes_changed
+        if rollup is not None:
+            directories.add(path, change.bytes_changed)
+
+        entry = (change.bytes_changed, -i, path, change)
+
+        if len(largest_n_heap) < show_n_largest_files:
+            heapq.heappush(largest_n_heap, entry)
+        elif show_n_largest_files > 0 and entry[:2] > largest_n_heap[0][:2]:
+            heapq.heapreplace(largest_n_heap, entry)
+
     exceeds_limit = limit is not None and cumulative_size_difference > limit
 
-    def bytes_diff(num: int) -> str:
-        return ("+" if num >= 0 else "") + human_friendly_bytes(num)
+    if rollup == "json":
+        if not quiet:
+            print(json.dumps(directories.to_json(".", rollup_top, rollup_depth), indent=2))
+        return 1 if exceeds_limit else 0
 
     if not quiet:
-        print(f"Total file size difference for commit range '{commit_range}': ")
+        kind = "Packed size of objects added" if measure == "packed" else "Total file size difference"
+        print(f"{kind} for commit range '{commit_range}': ")
         print(f"\t{bytes_diff(cumulative_size_difference)}", end="")
         print(f" (Exceeds set limit of {bytes_diff(limit)})" if exceeds_limit else "")
 
-        largest_n_sizes = sorted(size_differences.items(), key=lambda x: x[1].bytes_changed, reverse=True)[
-            :show_n_largest_files
-        ]
+        largest_n_sizes = [(path, val) for *_, path, val in sorted(largest_n_heap, key=lambda x: x[:2], reverse=True)]
 
         if largest_n_sizes:
             print("")
             print(f"Largest {len(largest_n_sizes)} filesize differences:")
 
         for path, val in largest_n_sizes:
-            print(f"\t{bytes_diff(val.bytes_changed)}\t{path}")
+            record = val.diff_record
+            source = f" ({'renamed' if record.status == 'R' else 'copied'} from {record.src_path})"
+            print(f"\t{bytes_diff(val.bytes_changed)}\t{path}" + (source if record.status in "CR" else ""))
+
+        if rollup == "tree" and directories.children:
+            print("")
+            print(f"Directory size differences (largest {rollup_top} of each directory, {rollup_depth} levels deep):")
+            for line in directories.tree_lines(rollup_top, rollup_depth):
+                print(line)
 
     return 1 if exceeds_limit else 0
 
@@ -176,6 +666,11 @@ def num_bytes(arg: str) -> int:
         raise error from e
 
 
+def bytes_diff(num: int) -> str:
+    """Prints a signed number of bytes as a human friendly string"""
+    return ("+" if num >= 0 else "") + human_friendly_bytes(num)
+
+
 def human_friendly_bytes(num: int) -> str:
     """Prints a number of bytes as a human friendly string"""
     for prefix in ["", "K", "M", "G", "T", "P", "E", "Z"]:
@@ -208,4 +703,40 @@ if __name__ == "__main__":
         help="Show this many of the largest files in diff",
         default=30,
     )
+    parser.add_argument(
+        "--timeline",
+        choices=["json", "csv"],
+        help="Instead of a summary, write the size difference of each commit in the range, "
+        + "and of each file in it, in this format",
+    )
+    parser.add_argument(
+        "--no-renames",
+        action="store_true",
+        help="Count renamed and copied files as a whole addition (and deletion) rather than by how much they changed",
+    )
+    parser.add_argument(
+        "--measure",
+        choices=["raw", "packed"],
+        default="raw",
+        help="'raw' measures files by their size. 'packed' measures the objects a change adds by the size "
+        + "they take up in git's object store, which approximates what a clone or fetch transfers",
+    )
+    parser.add_argument(
+        "--rollup",
+        choices=["tree", "json"],
+        help="Also add up the size differences of each directory, and show the largest subdirectories "
+        + "of each as a tree, or instead print them as JSON",
+    )
+    parser.add_argument(
+        "--rollup-top",
+        type=int,
+        help="Show this many of the largest subdirectories of each directory in the rollup",
+        default=5,
+    )
+    parser.add_argument(
+        "--rollup-depth",
+        type=int,
+        help="Show this many levels of subdirectories in the rollup",
+        default=3,
+    )
     sys.exit(main(**vars(parser.parse_args())))
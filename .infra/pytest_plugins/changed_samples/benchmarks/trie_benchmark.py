@@ -0,0 +1,112 @@
+"""Compare the memory use and `is_prefix` latency of `Trie` with a node-per-component trie
+
+Usage: python benchmarks/trie_benchmark.py [N ...]
+
+The paths are synthetic, shaped like a monorepo diff: 4 to 12 components below a common root,
+drawn from a vocabulary of directory names, so that paths share prefixes as they do in practice.
+"""
+
+import random
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from pytest_changed_samples.trie import Trie
+
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000)
+QUERIES = 200_000
+
+
+class NodeTrie:
+    """The previous implementation: a dataclass node with its own dict per path component"""
+
+    @dataclass
+    class Node:
+        is_end: bool = False
+        children: Dict[str, "NodeTrie.Node"] = field(default_factory=dict)
+
+    def __init__(self) -> None:
+        self.root = NodeTrie.Node()
+
+    def insert(self, elems: Iterable[str]) -> None:
+        curr = self.root
+        for elem in elems:
+            curr = curr.children.setdefault(elem, NodeTrie.Node())
+        curr.is_end = True
+
+    def is_prefix(self, elems: Iterable[str]) -> bool:
+        curr = self.root
+        for part in elems:
+            if part not in curr.children:
+                return False
+            curr = curr.children[part]
+        return True
+
+
+def make_paths(n: int, rng: random.Random) -> List[Tuple[str, ...]]:
+    vocabulary = [f"dir{i}" for i in range(200)]
+    root = ("/", "home", "runner", "work", "repo")
+    paths = set()
+
+    while len(paths) < n:
+        depth = rng.randint(3, 11)
+        paths.add(root + tuple(rng.choice(vocabulary) for _ in range(depth)) + (f"file{rng.randrange(50)}.py",))
+
+    return sorted(paths)
+
+
+def make_queries(paths: List[Tuple[str, ...]], rng: random.Random) -> List[Tuple[str, ...]]:
+    """Directory prefixes of inserted paths (hits), and of the same with a changed component (mostly misses)"""
+    queries = []
+
+    for _ in range(QUERIES):
+        path = rng.choice(paths)
+        prefix = list(path[: rng.randint(5, len(path) - 1)])
+        if rng.random() < 0.5:
+            prefix[-1] = "other"
+        queries.append(tuple(str(p) for p in prefix))  # Distinct string objects, like `Path.parts`
+
+    return queries
+
+
+def measure(build: Callable[[], object]) -> Tuple[object, float, int]:
+    tracemalloc.start()
+    start = time.perf_counter()
+    trie = build()
+    elapsed = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return trie, elapsed, size
+
+
+def node_trie(paths: List[Tuple[str, ...]]) -> NodeTrie:
+    trie = NodeTrie()
+    for p in paths:
+        trie.insert(p)
+    return trie
+
+
+def main(sizes: Iterable[int]) -> None:
+    rng = random.Random(0)
+    print(f"{'paths':>9} {'impl':>10} {'build s':>8} {'memory MB':>10} {'is_prefix ns':>13}")
+
+    for n in sizes:
+        paths = make_paths(n, rng)
+        queries = make_queries(paths, rng)
+
+        for name, build in (("node", lambda: node_trie(paths)), ("compact", lambda: Trie.from_paths(paths))):
+            trie, build_time, size = measure(build)
+
+            start = time.perf_counter()
+            hits = sum(trie.is_prefix(q) for q in queries)  # type: ignore[attr-defined]
+            latency = (time.perf_counter() - start) / len(queries)
+
+            megabytes = size / (1 << 20)
+            print(f"{n:>9} {name:>10} {build_time:>8.2f} {megabytes:>10.1f} {latency * 1e9:>13.0f}  ({hits} hits)")
+            del trie
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or DEFAULT_SIZES)
@@ -0,0 +1,203 @@
+"""Static dependency graph of sample scripts
+
+The direct inputs of a sample are found by parsing it, without running it:
+
+* Imports of modules that resolve to files next to the sample, e.g. `import user_functions`
+* String literals, and `os.path.join(...)` or `Path(...) / ...` chains of them, that name an existing
+  file or directory relative to the sample's directory or the rootdir, e.g. `"../assets/product_info_1.md"`
+* A `requirements.txt` next to the sample
+
+Imported local modules are parsed in turn, so the inputs of a sample are the transitive closure of
+its direct inputs. Direct inputs are cached per file, keyed by the file's mtime and size.
+"""
+
+import ast
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, List, Optional, Set
+
+IMPLICIT_INPUTS = ("requirements.txt",)
+"""Files in a sample's directory that are inputs of the sample even if it doesn't mention them"""
+
+JOIN_FUNCTIONS = {"join", "joinpath", "Path", "PurePath"}
+"""Calls whose string arguments are joined into a single path, e.g. `os.path.join(here, "data", "x.csv")`"""
+
+
+class DependencyGraph:
+    """The inputs of sample scripts, found by static analysis"""
+
+    def __init__(self, root: Path, cache: Optional[Dict[str, Any]] = None) -> None:
+        """
+        :param Path root: The rootdir, which relative paths in samples may also be relative to
+        :param Optional[Dict[str, Any]] cache: Direct inputs from a previous session, as returned by `to_cache`
+        """
+        self.root = root.resolve()
+        self.cache: Dict[str, Any] = dict(cache or {})
+        self.changed = False
+
+    def to_cache(self) -> Dict[str, Any]:
+        return self.cache
+
+    def direct_inputs(self, path: Path) -> List[Path]:
+        """Get the files and directories a script reads or imports directly
+
+        :param Path path: The resolved path to the script
+        :returns: The inputs
+        :rtype: List[Path]
+        """
+        stat = path.stat()
+        entry = self.cache.get(str(path))
+
+        if entry is None or (entry["mtime_ns"], entry["size"]) != (stat.st_mtime_ns, stat.st_size):
+            inputs = sorted(str(p) for p in find_inputs(path, self.root))
+            entry = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "inputs": inputs}
+            self.cache[str(path)] = entry
+            self.changed = True
+
+        return [Path(p) for p in entry["inputs"]]
+
+    def inputs(self, path: Path) -> FrozenSet[Path]:
+        """Get everything a script depends on, including itself and the inputs of the local modules it imports
+
+        :param Path path: The path to the script
+        :returns: The transitive inputs
+        :rtype: FrozenSet[Path]
+        """
+        path = path.resolve()
+        seen: Set[Path] = {path}
+        stack = [path]
+
+        while stack:
+            for p in self.direct_inputs(stack.pop()):
+                if p in seen:
+                    continue
+
+                seen.add(p)
+                if p.suffix == ".py" and p.is_file():
+                    stack.append(p)
+
+        return frozenset(seen)
+
+
+def find_inputs(path: Path, root: Path) -> Set[Path]:
+    """Find the direct inputs of a script by parsing it
+
+    :param Path path: The resolved path to the script
+    :param Path root: The resolved rootdir
+    :returns: The resolved paths of the inputs
+    :rtype: Set[Path]
+    """
+    directory = path.parent
+    inputs = {p for p in (directory / name for name in IMPLICIT_INPUTS) if p.is_file()}
+
+    try:
+        tree = ast.parse(path.read_bytes(), filename=str(path))
+    except (SyntaxError, ValueError):
+        return inputs
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                inputs.update(module_files(directory, alias.name.split(".")))
+        elif isinstance(node, ast.ImportFrom):
+            base = directory
+            for _ in range(node.level - 1):
+                base = base.parent
+            parts = node.module.split(".") if node.module else []
+            inputs.update(module_files(base, parts))
+            for alias in node.names:
+                # `from package import submodule`
+                inputs.update(module_files(base, parts + [alias.name]))
+        else:
+            for candidate in path_literals(node):
+                inputs.update(existing_paths(candidate, directory, root))
+
+    inputs.discard(path)
+    return inputs
+
+
+def module_files(base: Path, parts: List[str]) -> Iterator[Path]:
+    """Get the files executed by importing a module, if it resolves to files under `base`
+
+    :param Path base: The directory the import is resolved against
+    :param List[str] parts: The dotted name of the module, split into parts
+    :returns: The module's file, and the `__init__.py` of every package on the way to it
+    :rtype: Iterator[Path]
+    """
+    current = base
+
+    for i, part in enumerate(parts):
+        current = current / part
+        init = current / "__init__.py"
+
+        if init.is_file():
+            yield init
+        elif i == len(parts) - 1 and current.with_name(part + ".py").is_file():
+            yield current.with_name(part + ".py")
+        elif not current.is_dir():
+            return
+
+
+def path_literals(node: ast.AST) -> Iterator[str]:
+    """Get the strings in a node that might be paths
+
+    :param ast.AST node: The node
+    :returns: A single string constant, or the joined string arguments of a path join
+    :rtype: Iterator[str]
+    """
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        yield node.value
+    elif isinstance(node, ast.Call) and call_name(node.func) in JOIN_FUNCTIONS:
+        parts = [a.value for a in node.args if isinstance(a, ast.Constant) and isinstance(a.value, str)]
+        if len(parts) > 1:
+            yield "/".join(parts)
+    elif isinstance(node, ast.BinOp) and isinstance(node.op, ast.Div):
+        # e.g. `Path(__file__).parent / "data" / "x.csv"`
+        parts = list(division_strings(node))
+        if len(parts) > 1:
+            yield "/".join(parts)
+
+
+def division_strings(node: ast.AST) -> Iterable[str]:
+    """Get the string constants of a chain of `/` operations, in order"""
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Div):
+        yield from division_strings(node.left)
+        yield from division_strings(node.right)
+    elif isinstance(node, ast.Constant) and isinstance(node.value, str):
+        yield node.value
+
+
+def call_name(func: ast.AST) -> Optional[str]:
+    if isinstance(func, ast.Name):
+        return func.id
+    if isinstance(func, ast.Attribute):
+        return func.attr
+    return None
+
+
+def existing_paths(candidate: str, directory: Path, root: Path) -> Iterator[Path]:
+    """Resolve a string that might be a path against the script's directory and the rootdir
+
+    Directories that contain the script (e.g. `".."`) are never inputs, since they would make
+    every change an input.
+
+    :param str candidate: The string
+    :param Path directory: The resolved directory of the script
+    :param Path root: The resolved rootdir
+    :returns: The paths that exist
+    :rtype: Iterator[Path]
+    """
+    if not 0 < len(candidate) < 256 or "\n" in candidate or "\0" in candidate:
+        return
+    if "." not in candidate and "/" not in candidate:
+        return
+    if not candidate.strip("./"):
+        return
+
+    for base in (directory, root):
+        try:
+            p = (base / candidate).resolve()
+        except (OSError, RuntimeError, ValueError):
+            continue
+
+        if p.is_file() or (p.is_dir() and p not in (directory, *directory.parents)):
+            yield p
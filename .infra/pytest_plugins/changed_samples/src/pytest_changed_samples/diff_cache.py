@@ -0,0 +1,50 @@
+from pathlib import Path
+from typing import Dict, List
+
+import pytest
+
+from .git_utils import find_repo_root, get_diff_paths, resolve_commits
+
+DIFF_CACHE_KEY = "changed-samples/diffs"
+"""The pytest cache key of the paths changed between pairs of commits"""
+
+DIFF_CACHE_SIZE = 8
+"""The number of diffs kept in the cache"""
+
+
+def get_cached_diff_paths(cache: pytest.Cache, a: str, b: str) -> List[Path]:
+    """Get the paths that have changed between two git refs, reusing the result of a previous session
+
+    Diffs are cached by the SHAs the refs resolve to, so the cached paths are reused until either
+    ref moves. Only diffs between commits can be cached: a diff against the working tree changes
+    with every edit, and finding out whether it did costs as much as diffing. The `DIFF_CACHE_SIZE`
+    most recently used diffs are kept.
+
+    :param pytest.Cache cache: The pytest cache
+    :param str a: The base ref to diff against
+    :param str b: The ending ref to diff against
+    :returns: The list of paths
+    :rtype: List[Path]
+    """
+    repo_path = find_repo_root()
+    commits = resolve_commits([a, b], repo_path)
+    key = "..".join(commits)
+    diffs: Dict[str, List[str]] = cache.get(DIFF_CACHE_KEY, {})
+    cached = diffs.get(key)
+
+    if cached is not None:
+        paths = [repo_path.joinpath(p) for p in cached]
+        if list(diffs)[-1] == key:
+            # Already the most recently used diff, so the cache needn't be written
+            return paths
+        del diffs[key]
+    else:
+        # Diff the resolved commits rather than the refs, in case a ref moved in the meantime
+        paths = list(get_diff_paths(*commits))
+        cached = [p.relative_to(repo_path).as_posix() for p in paths]
+
+    # The most recently used diff goes last, so that trimming evicts the least recently used ones
+    diffs[key] = cached
+    cache.set(DIFF_CACHE_KEY, dict(list(diffs.items())[-DIFF_CACHE_SIZE:]))
+
+    return paths
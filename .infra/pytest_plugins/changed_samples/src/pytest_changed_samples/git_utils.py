@@ -1,30 +1,166 @@
+import os
+import subprocess
 from pathlib import Path
-from typing import Iterable, Optional
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
 
-from git import Repo
+READ_SIZE = 1 << 16
+"""The number of bytes read from git's output at a time"""
+
+UNION = "union"
+INTERSECTION = "intersection"
+
+
+def find_repo_root(start: Optional[Path] = None) -> Path:
+    """Find the root of the working tree that contains a directory
+
+    :param Optional[Path] start: The directory to search upwards from. Defaults to the current working directory.
+    :returns: The resolved path of the working tree's root (the directory containing `.git`)
+    :rtype: Path
+    """
+    start = (start or Path.cwd()).resolve()
+
+    for directory in (start, *start.parents):
+        if (directory / ".git").exists():
+            return directory
+
+    raise FileNotFoundError(f"{start} is not inside of a git repository")
+
+
+def iter_nul_separated(args: List[str], cwd: Path, stdin: Optional[bytes] = None) -> Iterator[str]:
+    """Run a command and lazily yield the NUL separated records it writes to stdout
+
+    :param List[str] args: The command
+    :param Path cwd: The directory to run it in
+    :param Optional[bytes] stdin: Written to the command's stdin, if given
+    :returns: The non-empty records, as they are read
+    :rtype: Iterator[str]
+    """
+    stdin_pipe = subprocess.PIPE if stdin is not None else subprocess.DEVNULL
+
+    with subprocess.Popen(args, cwd=cwd, stdin=stdin_pipe, stdout=subprocess.PIPE, stderr=subprocess.PIPE) as process:
+        assert process.stdout is not None and process.stderr is not None
+
+        if stdin is not None:
+            # Small enough (a line per diff) not to fill the pipe while git's output isn't being read
+            assert process.stdin is not None
+            process.stdin.write(stdin)
+            process.stdin.close()
+        pending = b""
+
+        for chunk in iter(lambda: process.stdout.read1(READ_SIZE), b""):  # type: ignore[union-attr]
+            *records, pending = (pending + chunk).split(b"\0")
+
+            for record in records:
+                if record:
+                    yield os.fsdecode(record)
+
+        stderr = process.stderr.read()
+
+        if process.wait() != 0:
+            raise subprocess.CalledProcessError(process.returncode, args, stderr=stderr)
+
+        if pending:
+            yield os.fsdecode(pending)
+
+
+def resolve_commits(refs: List[str], repo_path: Path) -> List[str]:
+    """Resolve refs to the SHAs of the commits they point to
+
+    :param List[str] refs: The refs (e.g. `HEAD`, `main`)
+    :param Path repo_path: The root of the working tree
+    :returns: The full SHA of each ref's commit, in order
+    :rtype: List[str]
+    """
+    args = ["git", "rev-parse", *(f"{ref}^{{commit}}" for ref in refs)]
+    return subprocess.run(args, cwd=repo_path, check=True, capture_output=True, text=True).stdout.split()
 
 
 def get_diff_paths(a: str, b: Optional[str]) -> Iterable[Path]:
     """Get a list of paths that have changed between two git refs
 
+    Both the old and the new path of a renamed file are included.
+
     :param str a: The base ref to diff against
     :param Optional[str] b: The ending ref to diff against. If "None",
         will diff against the working tree
     :returns: The list of paths
     :rtype: Iterable[Path]
     """
-    repo = Repo(search_parent_directories=True)
-    repo_path = Path(repo.working_dir).resolve()
+    repo_path = find_repo_root()
+
+    # Against the working tree, this includes changes that are either in the working tree or staged in the index
+    args = ["git", "diff", "--name-only", "--no-renames", "--no-ext-diff", "-z", a]
+    if b is not None:
+        args.append(b)
+    args.append("--")
+
+    for p in iter_nul_separated(args, repo_path):
+        yield repo_path.joinpath(p)
+
+
+def merge_base(a: str, b: str, repo_path: Path) -> str:
+    """Get the SHA of the best common ancestor of two commits
+
+    :param str a: A commit
+    :param str b: Another commit
+    :param Path repo_path: The root of the working tree
+    :returns: The SHA of the merge-base
+    :rtype: str
+    """
+    args = ["git", "merge-base", a, b]
+    return subprocess.run(args, cwd=repo_path, check=True, capture_output=True, text=True).stdout.strip()
+
+
+def diff_trees(pairs: Sequence[Tuple[str, str]], repo_path: Path) -> List[Set[str]]:
+    """Get the paths changed between several pairs of commits, with a single git call
+
+    Every pair is written to `git diff-tree --stdin`, which (with `--always`) starts the output of
+    each diff with a record holding the pair's first commit.
+
+    :param Sequence[Tuple[str, str]] pairs: The SHAs of the commits to diff
+    :param Path repo_path: The root of the working tree
+    :returns: The changed paths (relative to the root) of each pair, in order
+    :rtype: List[Set[str]]
+    """
+    if not pairs:
+        return []
+
+    args = ["git", "diff-tree", "--stdin", "--always", "-r", "--name-only", "--no-renames", "--no-ext-diff", "-z"]
+    stdin = "".join(f"{a} {b}\n" for a, b in pairs).encode("ascii")
+    diffs: List[Set[str]] = []
+
+    for record in iter_nul_separated(args, repo_path, stdin):
+        if len(diffs) < len(pairs) and record == pairs[len(diffs)][0]:
+            diffs.append(set())
+        else:
+            diffs[-1].add(record)
+
+    return diffs
+
+
+def get_merge_base_diff_paths(refs: Sequence[str], combine: str = UNION) -> Iterable[Path]:
+    """Get the paths changed on HEAD since it diverged from each of several refs
+
+    :param Sequence[str] refs: The refs (e.g. `origin/main`)
+    :param str combine: Whether to get the paths changed relative to any (`union`) or all (`intersection`) of the refs
+    :returns: The list of paths
+    :rtype: Iterable[Path]
+    """
+    repo_path = find_repo_root()
+    (head,) = resolve_commits(["HEAD"], repo_path)
 
-    # Diffs that are either in the working tree or staged in the index
-    changed_files = repo.commit(a).diff(b)
+    # Refs often share a merge-base, which is only diffed once
+    bases = [merge_base(head, ref, repo_path) for ref in refs]
+    unique_bases = list(dict.fromkeys(bases))
+    diffs: Dict[str, Set[str]] = dict(zip(unique_bases, diff_trees([(b, head) for b in unique_bases], repo_path)))
 
-    for c in changed_files:
-        for p in {c.a_path, c.b_path}:
-            if p is None:
-                continue
+    if combine == INTERSECTION:
+        paths = set.intersection(*(diffs[b] for b in bases)) if bases else set()
+    else:
+        paths = set().union(*(diffs[b] for b in bases))
 
-            yield Path(repo_path, p).resolve()
+    for p in sorted(paths):
+        yield repo_path.joinpath(p)
 
 
 def get_all_modified_paths() -> Iterable[Path]:
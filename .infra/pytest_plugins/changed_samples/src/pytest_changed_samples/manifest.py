@@ -0,0 +1,87 @@
+"""Content hashes of samples and their inputs
+
+The digest of a sample covers the path (relative to the rootdir) and the content hash of every
+file among its inputs (see `dependencies`), so it changes when an input is edited, added, removed
+or renamed, and only then. Touching a file, or changing a sibling the sample doesn't read, leaves
+it unchanged.
+
+File hashes are memoized by mtime and size, so unchanged files aren't read again.
+"""
+
+import hashlib
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+READ_SIZE = 1 << 16
+
+
+class ContentHashes:
+    """Hashes the content of files and of samples' inputs"""
+
+    def __init__(self, root: Path, cache: Optional[Dict[str, List[Any]]] = None) -> None:
+        """
+        :param Path root: The rootdir, which names in digests are relative to
+        :param Optional[Dict[str, List[Any]]] cache: File hashes from a previous session, as returned by `to_cache`
+        """
+        self.root = root.resolve()
+        self.cache: Dict[str, List[Any]] = dict(cache or {})
+        self.used: Dict[str, List[Any]] = {}
+        self.changed = False
+
+    def to_cache(self) -> Dict[str, List[Any]]:
+        """The hashes of the files hashed this session, as `[mtime_ns, size, sha256]` by path"""
+        return self.used
+
+    def file_hash(self, path: Path) -> Optional[str]:
+        """Get the SHA-256 of a file's content
+
+        :param Path path: The resolved path to the file
+        :returns: The hex digest, or None if the file doesn't exist
+        :rtype: Optional[str]
+        """
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return None
+
+        entry = self.cache.get(str(path))
+
+        if entry is None or entry[:2] != [stat.st_mtime_ns, stat.st_size]:
+            sha = hashlib.sha256()
+            with path.open("rb") as f:
+                for chunk in iter(lambda: f.read(READ_SIZE), b""):
+                    sha.update(chunk)
+
+            entry = [stat.st_mtime_ns, stat.st_size, sha.hexdigest()]
+            self.cache[str(path)] = entry
+            self.changed = True
+
+        self.used[str(path)] = entry
+        return entry[2]
+
+    def digest(self, inputs: Iterable[Path]) -> str:
+        """Get a digest of a set of inputs
+
+        :param Iterable[Path] inputs: Resolved paths of files, and of directories whose files are all inputs
+        :returns: The hex digest
+        :rtype: str
+        """
+        files: Set[Path] = set()
+
+        for p in inputs:
+            if p.is_dir():
+                files.update(f for f in p.rglob("*") if f.is_file())
+            else:
+                files.add(p)
+
+        sha = hashlib.sha256()
+
+        for f in sorted(files):
+            try:
+                name = f.relative_to(self.root).as_posix()
+            except ValueError:
+                name = f.as_posix()
+
+            sha.update(f"{name}\0{self.file_hash(f) or 'missing'}\n".encode("utf-8"))
+
+        return sha.hexdigest()
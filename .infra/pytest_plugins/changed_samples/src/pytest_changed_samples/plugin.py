@@ -1,21 +1,71 @@
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Callable, Iterable, Optional
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 
 import pytest
 
-from .git_utils import get_all_modified_paths, get_branch_diff_paths
+from .dependencies import DependencyGraph
+from .diff_cache import get_cached_diff_paths
+from .git_utils import (
+    INTERSECTION,
+    UNION,
+    get_all_modified_paths,
+    get_branch_diff_paths,
+    get_merge_base_diff_paths,
+)
+from .manifest import ContentHashes
+from .prefix_cache import PrefixCache
 from .trie import Trie
 
 DIFF_PATH_TRIE_KEY = pytest.StashKey[Trie]()
 """A Stash key to a Trie that stores paths to files present in a diff"""
 
+PREFIX_CACHE_KEY = pytest.StashKey[PrefixCache]()
+"""A Stash key to the PrefixCache of the Trie of paths present in a diff"""
+
+PENDING_DIGESTS_KEY = pytest.StashKey[Dict[str, Tuple[str, str]]]()
+"""A Stash key to the manifest name and input digest of every selected sample, by node ID"""
+
+PASSED_DIGESTS_KEY = pytest.StashKey[Dict[str, str]]()
+"""A Stash key to the input digests of the samples that passed, by manifest name"""
+
+LIBS_DIGEST_KEY = pytest.StashKey[str]()
+"""A Stash key to the digest of the SDK wheels in `libs/`"""
+
+NEW_RESULTS_KEY = pytest.StashKey[Dict[str, Dict[str, Any]]]()
+"""A Stash key to the results of the samples that ran, by manifest name"""
+
+DEPENDENCIES_CACHE_KEY = "changed-samples/dependencies"
+"""The pytest cache key of the direct inputs of every sample script"""
+
+HASHES_CACHE_KEY = "changed-samples/hashes"
+"""The pytest cache key of the content hashes of sample inputs"""
+
+MANIFEST_CACHE_KEY = "changed-samples/manifest"
+"""The pytest cache key of the input digest of every sample, as of the last time it passed"""
+
+RESULTS_CACHE_KEY = "changed-samples/results"
+"""The pytest cache key of the last result of every sample, with the digests of its inputs and the SDK wheels"""
+
+LIBS_DIR = "libs"
+"""The directory (relative to the rootdir) of the SDK wheels that samples are tested against"""
+
 WORKING_TREE_CHANGES_OPTION = "--changed-samples-only"
 PR_CHANGES_OPTION = "--changed-samples-only-from"
+MERGE_BASE_CHANGES_OPTION = "--changed-samples-since-merge-base"
+COMBINE_OPTION = "--changed-samples-combine"
+BY_DEPENDENCY_OPTION = "--changed-samples-by-dependency"
+BY_HASH_OPTION = "--changed-samples-by-hash"
+SKIP_PASSED_OPTION = "--changed-samples-skip-passed"
 
 
 def is_plugin_active(config: pytest.Config) -> bool:
     """Return whether any of the plugin provided options were provided on commandline."""
-    return get_diff_paths_function(config) is not None
+    return (
+        get_diff_paths_function(config) is not None
+        or config.getoption(opt_var(BY_HASH_OPTION))
+        or config.getoption(opt_var(SKIP_PASSED_OPTION))
+    )
 
 
 def pytest_addoption(parser: pytest.Parser) -> None:
@@ -37,19 +87,78 @@ def pytest_addoption(parser: pytest.Parser) -> None:
         ),
     )
 
+    parser.addoption(
+        MERGE_BASE_CHANGES_OPTION,
+        action="append",
+        metavar="REF",
+        help=(
+            "Only collect tests for samples that have changed on HEAD since it diverged from the specified git ref"
+            + " (i.e. relative to their merge-base), ignoring changes made on the ref itself. Can be repeated."
+            + " A sample has 'changed' if any file in its parent directory has been modified."
+        ),
+    )
+
+    parser.addoption(
+        COMBINE_OPTION,
+        choices=(UNION, INTERSECTION),
+        default=UNION,
+        help=(
+            f"With several {MERGE_BASE_CHANGES_OPTION} refs, whether a file has changed if it changed relative"
+            + f" to any of them ({UNION}, the default) or to all of them ({INTERSECTION})."
+        ),
+    )
+
+    parser.addoption(
+        BY_DEPENDENCY_OPTION,
+        action="store_true",
+        help=(
+            f"With {WORKING_TREE_CHANGES_OPTION}, {PR_CHANGES_OPTION} or {MERGE_BASE_CHANGES_OPTION}, a Python sample"
+            + " has 'changed' if the sample, a local module it (transitively) imports, or a data file it references"
+            + " has been modified. Other samples (e.g. notebooks) still go by their parent directory."
+        ),
+    )
+
+    parser.addoption(
+        BY_HASH_OPTION,
+        action="store_true",
+        help=(
+            "Only run samples whose content, or the content of a local module or data file they use, differs from"
+            + " the last time they passed, according to a manifest of content hashes kept in the pytest cache."
+            + " Can be combined with the other options, in which case a sample must satisfy all of them."
+        ),
+    )
+
+    parser.addoption(
+        SKIP_PASSED_OPTION,
+        action="store_true",
+        help=(
+            "Skip samples whose last run passed with the same inputs (as for the manifest) and the same SDK wheels"
+            + f" in {LIBS_DIR}/, reporting them as cached passes. Results are kept in the pytest cache."
+        ),
+    )
+
 
 def pytest_configure(config: pytest.Config) -> None:
     # Validate that mutually exclusive options haven't been provided
-    mutually_exclusive_options = (WORKING_TREE_CHANGES_OPTION, PR_CHANGES_OPTION)
+    mutually_exclusive_options = (WORKING_TREE_CHANGES_OPTION, PR_CHANGES_OPTION, MERGE_BASE_CHANGES_OPTION)
     if sum(bool(config.getoption(opt_var(o))) for o in mutually_exclusive_options) > 1:
         raise pytest.UsageError(f"{' and '.join(mutually_exclusive_options)} are mutually exclusive")
 
+    if config.getoption(opt_var(BY_DEPENDENCY_OPTION)) and get_diff_paths_function(config) is None:
+        raise pytest.UsageError(
+            f"{BY_DEPENDENCY_OPTION} requires {WORKING_TREE_CHANGES_OPTION}, {PR_CHANGES_OPTION}"
+            + f" or {MERGE_BASE_CHANGES_OPTION}"
+        )
+
+    for option in (BY_HASH_OPTION, SKIP_PASSED_OPTION):
+        if config.getoption(opt_var(option)) and get_cache(config) is None:
+            raise pytest.UsageError(f"{option} requires the cacheprovider plugin")
+
 
 @pytest.hookimpl(hookwrapper=True)
 def pytest_collection(session: pytest.Session) -> None:
     """Set up path filtering based on git diff."""
     config = session.config
-    diff_path_trie = Trie()
 
     paths_filter = get_diff_paths_function(config)
 
@@ -58,14 +167,14 @@ def pytest_collection(session: pytest.Session) -> None:
         yield
         return
 
-    for p in paths_filter():
-        diff_path_trie.insert(p.parts)
-
+    diff_path_trie = Trie.from_paths(sorted(p.parts for p in paths_filter()))
     config.stash[DIFF_PATH_TRIE_KEY] = diff_path_trie
+    config.stash[PREFIX_CACHE_KEY] = PrefixCache(diff_path_trie)
 
     yield
 
     del config.stash[DIFF_PATH_TRIE_KEY]
+    del config.stash[PREFIX_CACHE_KEY]
 
 
 def pytest_ignore_collect(collection_path: Path, config: pytest.Config) -> Optional[bool]:
@@ -80,10 +189,177 @@ def pytest_ignore_collect(collection_path: Path, config: pytest.Config) -> Optio
     if len(diff_path_trie) == 0:
         return None
 
-    ignore_dir = collection_path if collection_path.is_dir() else collection_path.parent
+    # Samples may depend on files outside their directory, so they're selected after collection
+    if config.getoption(opt_var(BY_DEPENDENCY_OPTION)):
+        return None
 
     # Either definitely ignore this path, or defer decision to other plugins
-    return (not diff_path_trie.is_prefix(ignore_dir.resolve().parts)) or None
+    return config.stash[PREFIX_CACHE_KEY].is_ignored(collection_path) or None
+
+
+def pytest_collection_modifyitems(config: pytest.Config, items: List[pytest.Item]) -> None:
+    """Deselect samples none of whose inputs were touched by the current git diff, or changed since they last passed,
+    and skip samples that already passed with the same inputs."""
+    diff_path_trie = config.stash.get(DIFF_PATH_TRIE_KEY, None)
+    by_dependency = config.getoption(opt_var(BY_DEPENDENCY_OPTION)) and diff_path_trie is not None
+    by_hash = config.getoption(opt_var(BY_HASH_OPTION))
+    skip_passed = config.getoption(opt_var(SKIP_PASSED_OPTION))
+
+    if not by_dependency and not by_hash and not skip_passed:
+        return
+
+    cache = get_cache(config)
+    graph = DependencyGraph(config.rootpath, cache.get(DEPENDENCIES_CACHE_KEY, None) if cache is not None else None)
+    selected = items
+
+    # An empty diff is a NOOP, as in `pytest_ignore_collect`
+    if by_dependency and diff_path_trie is not None and len(diff_path_trie) != 0:
+        selected = select_by_dependency(graph, diff_path_trie, selected)
+    if by_hash or skip_passed:
+        stash_digests(config, graph, selected)
+    if by_hash:
+        selected = select_by_hash(config, selected)
+    if skip_passed:
+        skip_passed_samples(config, selected)
+
+    if graph.changed and cache is not None:
+        cache.set(DEPENDENCIES_CACHE_KEY, graph.to_cache())
+
+    if len(selected) != len(items):
+        kept = set(selected)
+        config.hook.pytest_deselected(items=[i for i in items if i not in kept])
+        items[:] = selected
+
+
+def select_by_dependency(graph: DependencyGraph, diff_path_trie: Trie, items: List[pytest.Item]) -> List[pytest.Item]:
+    """Select the samples with an input that was touched by a diff
+
+    :param DependencyGraph graph: The dependency graph of samples
+    :param Trie diff_path_trie: The paths present in the diff
+    :param List[pytest.Item] items: The collected items
+    :returns: The selected items
+    :rtype: List[pytest.Item]
+    """
+    changed: Dict[Path, bool] = {}
+
+    for item in items:
+        path = item.path
+
+        if path not in changed:
+            if path.suffix == ".py" and path.is_file():
+                inputs: Iterable[Path] = graph.inputs(path)
+            else:
+                inputs = [path.resolve().parent]
+
+            changed[path] = any(diff_path_trie.is_prefix(p.parts) for p in inputs)
+
+    return [item for item in items if changed[item.path]]
+
+
+def stash_digests(config: pytest.Config, graph: DependencyGraph, items: List[pytest.Item]) -> None:
+    """Stash the manifest name and input digest of every sample, and the digest of the SDK wheels
+
+    :param pytest.Config config: The pytest config
+    :param DependencyGraph graph: The dependency graph of samples
+    :param List[pytest.Item] items: The collected items
+    """
+    cache = get_cache(config)
+    assert cache is not None
+    hashes = ContentHashes(config.rootpath, cache.get(HASHES_CACHE_KEY, None))
+    digests: Dict[Path, str] = {}
+    pending: Dict[str, Tuple[str, str]] = {}
+
+    for item in items:
+        path = item.path
+
+        if path not in digests:
+            inputs = graph.inputs(path) if path.suffix == ".py" and path.is_file() else [path.resolve()]
+            digests[path] = hashes.digest(inputs)
+
+        pending[item.nodeid] = (manifest_name(config, path), digests[path])
+
+    libs = Path(config.rootpath, LIBS_DIR)
+    config.stash[LIBS_DIGEST_KEY] = hashes.digest(sorted(p.resolve() for p in libs.glob("*.whl")))
+
+    if hashes.changed:
+        cache.set(HASHES_CACHE_KEY, hashes.to_cache())
+
+    config.stash[PENDING_DIGESTS_KEY] = pending
+
+
+def select_by_hash(config: pytest.Config, items: List[pytest.Item]) -> List[pytest.Item]:
+    """Select the samples whose inputs' digest differs from the manifest
+
+    The digests of the selected samples are recorded in the manifest once they passed, so that a
+    sample that failed keeps being selected until it passes.
+
+    :param pytest.Config config: The pytest config
+    :param List[pytest.Item] items: The collected items, whose digests have been stashed
+    :returns: The selected items
+    :rtype: List[pytest.Item]
+    """
+    cache = get_cache(config)
+    assert cache is not None
+    manifest: Dict[str, str] = cache.get(MANIFEST_CACHE_KEY, {})
+    pending = config.stash[PENDING_DIGESTS_KEY]
+
+    config.stash[PASSED_DIGESTS_KEY] = {}
+    return [item for item in items if manifest.get(pending[item.nodeid][0]) != pending[item.nodeid][1]]
+
+
+def skip_passed_samples(config: pytest.Config, items: List[pytest.Item]) -> None:
+    """Skip the samples whose last result is a pass with the same inputs and SDK wheels
+
+    The results of the samples that do run are recorded once they ran.
+
+    :param pytest.Config config: The pytest config
+    :param List[pytest.Item] items: The collected items, whose digests have been stashed
+    """
+    cache = get_cache(config)
+    assert cache is not None
+    results: Dict[str, Dict[str, Any]] = cache.get(RESULTS_CACHE_KEY, {})
+    pending = config.stash[PENDING_DIGESTS_KEY]
+    libs = config.stash[LIBS_DIGEST_KEY]
+
+    for item in items:
+        name, digest = pending[item.nodeid]
+        result = results.get(name)
+
+        if result and result["outcome"] == "passed" and (result["digest"], result["libs"]) == (digest, libs):
+            reason = f"cached: passed in {result['duration']:.2f}s on {result['recorded_at']} with identical inputs"
+            item.add_marker(pytest.mark.skip(reason=reason))
+
+    config.stash[NEW_RESULTS_KEY] = {}
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_makereport(item: pytest.Item, call: pytest.CallInfo) -> Any:
+    """Remember the digest of a sample that passed, and the outcome and duration of a sample that ran."""
+    outcome = yield
+    report: pytest.TestReport = outcome.get_result()
+
+    pending = item.config.stash.get(PENDING_DIGESTS_KEY, None)
+
+    if report.when != "call" or pending is None or item.nodeid not in pending:
+        return
+
+    name, digest = pending[item.nodeid]
+    passed = item.config.stash.get(PASSED_DIGESTS_KEY, None)
+    new_results = item.config.stash.get(NEW_RESULTS_KEY, None)
+
+    if passed is not None and report.passed:
+        passed[name] = digest
+
+    if new_results is None:
+        return
+
+    new_results[name] = {
+        "digest": digest,
+        "libs": item.config.stash[LIBS_DIGEST_KEY],
+        "outcome": report.outcome,
+        "duration": report.duration,
+        "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
 
 
 @pytest.hookimpl(trylast=True)
@@ -91,28 +367,63 @@ def pytest_sessionfinish(session: pytest.Session, exitstatus: int) -> None:
     if not is_plugin_active(session.config):
         return
 
+    passed = session.config.stash.get(PASSED_DIGESTS_KEY, None)
+    cache = get_cache(session.config)
+
+    if passed and cache is not None:
+        manifest = cache.get(MANIFEST_CACHE_KEY, {})
+        manifest.update(passed)
+        cache.set(MANIFEST_CACHE_KEY, manifest)
+
+    new_results = session.config.stash.get(NEW_RESULTS_KEY, None)
+
+    if new_results and cache is not None:
+        results = cache.get(RESULTS_CACHE_KEY, {})
+        results.update(new_results)
+        cache.set(RESULTS_CACHE_KEY, results)
+
     if exitstatus == pytest.ExitCode.NO_TESTS_COLLECTED:
         session.exitstatus = pytest.ExitCode.OK
 
 
+def manifest_name(config: pytest.Config, path: Path) -> str:
+    """The name of a sample in the manifest: its POSIX path relative to the rootdir"""
+    try:
+        return path.resolve().relative_to(config.rootpath).as_posix()
+    except ValueError:
+        return path.resolve().as_posix()
+
+
 def get_diff_paths_function(config: pytest.Config) -> Optional[Callable[[], Iterable[Path]]]:
     """Get the function that returns paths present in a diff specfied by cmdline arguments
 
     :param pytest.Config config: The pytest config
     :returns: A function that returns one of:
         * Paths to files that have changed between HEAD and the working tree
-        * Paths to files that have changed between HEAD and main
+        * Paths to files that have changed between HEAD and main (cached by commit SHAs, if the cache is enabled)
+        * Paths to files that have changed on HEAD since its merge-base with each of several refs
         * No paths
     :rtype: Callable[[],Iterable[Path]]
     """
     if config.getoption(opt_var(WORKING_TREE_CHANGES_OPTION)):
         return get_all_modified_paths
     if ref := config.getoption(opt_var(PR_CHANGES_OPTION)):
+        cache = get_cache(config)
+        if cache is not None:
+            return lambda: get_cached_diff_paths(cache, "HEAD", ref)
         return lambda: get_branch_diff_paths(ref)
+    if refs := config.getoption(opt_var(MERGE_BASE_CHANGES_OPTION)):
+        combine = config.getoption(opt_var(COMBINE_OPTION))
+        return lambda: get_merge_base_diff_paths(refs, combine)
 
     return None
 
 
+def get_cache(config: pytest.Config) -> Optional[pytest.Cache]:
+    """Get the pytest cache, or None if the cacheprovider plugin is disabled (`-p no:cacheprovider`)"""
+    return getattr(config, "cache", None)
+
+
 def opt_var(s: str) -> str:
     """Return the name of the variable associated with a given commandline option
 
@@ -0,0 +1,60 @@
+from pathlib import Path
+from typing import Dict, Optional
+
+from .trie import Trie
+
+
+class PrefixCache:
+    """Memoizes whether directories lead to a path in a Trie, for deciding which paths to ignore.
+
+    Collection visits every entry of a directory before moving on, so siblings share their parent's
+    decision. The parent's trie node is cached, and each entry only descends one component from it,
+    rather than resolving the entry and walking the trie from the root.
+    """
+
+    def __init__(self, trie: "Trie[str]") -> None:
+        self.trie = trie
+        self.nodes: Dict[Path, Optional[int]] = {}
+        """The trie node of each directory seen so far, or None if nothing in the trie is under it"""
+
+    def directory_node(self, directory: Path) -> Optional[int]:
+        """Get the trie node of a directory, resolving it if it hasn't been seen before
+
+        :param Path directory: The directory
+        :returns: The id of the node, or None if nothing in the trie is under the directory
+        :rtype: Optional[int]
+        """
+        try:
+            return self.nodes[directory]
+        except KeyError:
+            node = self.nodes[directory] = self.trie.find(directory.resolve().parts)
+            return node
+
+    def is_ignored(self, path: Path) -> bool:
+        """Whether a path is neither in, nor leads to, anything in the trie
+
+        A file is judged by its directory. A directory is judged by its location in its (resolved)
+        parent, so a symlinked directory is judged by where the link is rather than its target.
+
+        :param Path path: A file or directory being collected
+        :returns: Whether to ignore the path
+        :rtype: bool
+        """
+        parent = self.directory_node(path.parent)
+
+        if parent is None:
+            return True
+
+        node = self.trie.find((path.name,), parent)
+
+        if node is not None:
+            # Remembered in case `path` is a directory whose entries are collected next
+            self.nodes[path] = node
+            return False
+
+        # Only a directory can be ignored inside of a directory that isn't
+        if path.is_dir():
+            self.nodes[path] = None
+            return True
+
+        return False
@@ -1,55 +1,159 @@
-from dataclasses import dataclass, field
-from typing import Dict, Generic, Iterable, TypeVar
-
-from typing_extensions import Self
+from typing import Dict, Generic, Iterable, List, Optional, Sequence, TypeVar
 
 T = TypeVar("T")
-T2 = TypeVar("T2")
 
 
 class Trie(Generic[T]):
-    """A trie that accepts the parts (i.e `Path.parts`) of an absolute path, and stores some associated payload."""
+    """A trie that accepts the parts (i.e `Path.parts`) of an absolute path.
+
+    Rather than an object per node, the trie is stored in flat tables: nodes are integer ids, each
+    distinct path component is interned to an integer id, and every component has one dict mapping
+    a node to its child for that component. Large diffs therefore cost a few table entries per path
+    instead of a node object and a dict per path component, and a lookup only hashes small ints
+    that already exist, rather than building a key per component.
+    """
 
-    @dataclass
-    class Node(Generic[T2]):
-        """A trie node."""
+    __slots__ = ("components", "children", "ends", "len")
 
-        is_end: bool = False
-        children: Dict[T2, Self] = field(default_factory=dict)
+    ROOT = 0
+    """The id of the root node"""
 
     def __init__(self) -> None:
-        self.root: Trie.Node[T] = Trie.Node()
+        self.components: Dict[T, int] = {}
+        """Maps path components to their ids"""
+        self.children: List[Dict[int, int]] = []
+        """Indexed by component id, maps a node to its child for that component"""
+        self.ends = bytearray(1)
+        """Non-zero for the nodes at which an inserted path ends, indexed by node id"""
         self.len = 0
 
     def __len__(self) -> int:
         return self.len
 
+    @classmethod
+    def from_paths(cls, paths: Iterable[Sequence[T]]) -> "Trie[T]":
+        """Build a trie from many paths at once.
+
+        Consecutive paths that share a prefix only descend from where they diverge, so this is
+        fastest when the paths are sorted.
+
+        :param Iterable[Sequence[T]] paths: The parts of each path
+        :returns: The trie
+        :rtype: Trie[T]
+        """
+        trie = cls()
+        stack = [cls.ROOT]
+        previous: Sequence[T] = ()
+
+        for elems in paths:
+            common = 0
+            limit = min(len(previous), len(elems))
+            while common < limit and previous[common] == elems[common]:
+                common += 1
+
+            del stack[common + 1 :]
+            node = stack[-1]
+
+            for elem in elems[common:]:
+                node = trie.add_child(node, elem)
+                stack.append(node)
+
+            trie.mark_end(node)
+            previous = elems
+
+        return trie
+
     def insert(self, elems: Iterable[T]) -> None:
-        """Insert a payload for a given path.
+        """Insert a path.
 
-        :param Optional[PathType] p: The path to insert. If `None`, will insert at root
-        :param T payload: The payload to store
-        :returns: Whether or not the inserted path is the prefix of another path in the trie.
-        :rtype: InsertType
+        :param Iterable[T] elems: The parts of the path to insert
         """
-        curr = self.root
+        node = self.ROOT
 
         for elem in elems:
-            curr = curr.children.setdefault(elem, Trie.Node())
+            node = self.add_child(node, elem)
 
-        if not curr.is_end:
-            curr.is_end = True
-            self.len += 1
+        self.mark_end(node)
 
     def is_prefix(self, elems: Iterable[T]) -> bool:
         """Check whether is the prefix of anything inserted into the trie"""
+        # `find` inlined, since this runs for every collected path
+        components, children = self.components, self.children
+        node: Optional[int] = self.ROOT
 
-        curr = self.root
-
-        for part in elems:
-            if part not in curr.children:
+        for elem in elems:
+            component = components.get(elem)
+            if component is None:
                 return False
 
-            curr = curr.children[part]
+            node = children[component].get(node)  # type: ignore[arg-type]
+            if node is None:
+                return False
 
         return True
+
+    def find(self, elems: Iterable[T], node: int = ROOT) -> Optional[int]:
+        """Get the node reached by descending along a path
+
+        :param Iterable[T] elems: The parts of the path
+        :param int node: The id of the node to descend from. Defaults to the root.
+        :returns: The id of the node, or None if the path isn't the prefix of anything inserted
+        :rtype: Optional[int]
+        """
+        # `child` inlined, since this runs for every collected path
+        components, children = self.components, self.children
+        current: Optional[int] = node
+
+        for elem in elems:
+            component = components.get(elem)
+            if component is None:
+                return None
+
+            current = children[component].get(current)  # type: ignore[arg-type]
+            if current is None:
+                return None
+
+        return current
+
+    def child(self, node: int, elem: T) -> Optional[int]:
+        """Get the child of a node for a path component, if there is one
+
+        :param int node: The id of the node
+        :param T elem: The path component
+        :returns: The id of the child node, or None
+        :rtype: Optional[int]
+        """
+        component = self.components.get(elem)
+
+        if component is None:
+            return None
+
+        return self.children[component].get(node)
+
+    def add_child(self, node: int, elem: T) -> int:
+        """Get the child of a node for a path component, creating it if necessary
+
+        :param int node: The id of the node
+        :param T elem: The path component
+        :returns: The id of the child node
+        :rtype: int
+        """
+        component = self.components.get(elem)
+
+        if component is None:
+            component = self.components[elem] = len(self.children)
+            self.children.append({})
+
+        table = self.children[component]
+        child = table.get(node)
+
+        if child is None:
+            child = table[node] = len(self.ends)
+            self.ends.append(0)
+
+        return child
+
+    def mark_end(self, node: int) -> None:
+        if not self.ends[node]:
+            self.ends[node] = 1
+            self.len += 1
@@ -0,0 +1,163 @@
+"""Compare polling a function-calling run with streaming its events (from the getting-started-agents samples)
+
+Usage: python benchmarks/function_calling_benchmark.py [--runs N] [PROCESSING_TIME ...]
+
+Runs of an agent with a function tool are created through the Agents SDK against the local
+stand-in (see `fake_agents`), which has them request a call to the function before replying.
+`--runs` runs at a time, for each processing time, are driven with each strategy:
+
+* `polling`: `functions_calling.py`, which waits with `RunWaiter`, submits the tool outputs, waits
+  again and then lists the run's messages
+* `polling+hint`: the same, with the stand-in sending a `retry-after-ms` hint
+* `streaming`: `functions_calling_streaming.py`, which streams the run's events and submits the
+  tool outputs on a new stream as soon as they are requested
+
+For each, the mean number of requests per run (creating it, reading it, submitting tool outputs and
+reading the reply) and the mean time from creating the run to the first token of the reply are reported.
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+from pytest_sample_runner.fake_agents import FakeAgentsSettings, running_fake_agents_service
+from pytest_sample_runner.patching import OfflineCredential
+from pytest_sample_runner.traffic import STAND_IN_ENVIRONMENT, redirecting
+
+SAMPLES = Path(__file__).resolve().parents[4] / "samples" / "microsoft" / "python" / "getting-started-agents"
+sys.path.append(str(SAMPLES))
+
+from run_polling import RunWaiter  # noqa: E402
+
+DEFAULT_PROCESSING_TIMES = (0.4, 1.3, 3.7)
+
+RUN_ROUTES = ("create_run", "get_run", "submit_tool_outputs", "list_messages")
+"""The routes a run's requests are counted on"""
+
+Strategy = Callable[[Any, Any, str, str], float]
+"""Drives a run, given a client, the function tool, a thread ID and an agent ID, and returns the time to first token"""
+
+
+def fetch_weather(location: str) -> str:
+    """Fetches the weather.
+
+    :param location: The location.
+    :return: json
+    """
+    return "{}"
+
+
+def submit_outputs(client: Any, functions: Any, run: Any, stream_handler: Any = None) -> None:
+    """Execute the function calls a run requires, and submit their outputs"""
+    from azure.ai.agents.models import ToolOutput
+
+    tool_calls = run.required_action.submit_tool_outputs.tool_calls
+    outputs = [ToolOutput(tool_call_id=c.id, output=functions.execute(c)) for c in tool_calls]
+
+    if stream_handler is None:
+        client.runs.submit_tool_outputs(thread_id=run.thread_id, run_id=run.id, tool_outputs=outputs)
+    else:
+        client.runs.submit_tool_outputs_stream(
+            thread_id=run.thread_id, run_id=run.id, tool_outputs=outputs, event_handler=stream_handler
+        )
+
+
+def run_polling(client: Any, functions: Any, thread_id: str, agent_id: str) -> float:
+    started = time.monotonic()
+    waiter = RunWaiter()
+    run = client.runs.create(thread_id=thread_id, agent_id=agent_id)
+    run = waiter.wait(client.runs.get, thread_id=thread_id, run_id=run.id)
+
+    while run.status == "requires_action":
+        submit_outputs(client, functions, run)
+        run = waiter.wait(client.runs.get, thread_id=thread_id, run_id=run.id)
+
+    # The whole reply arrives at once, with the run's messages
+    next(iter(client.messages.list(thread_id=thread_id, run_id=run.id)))
+    return time.monotonic() - started
+
+
+def run_streaming(client: Any, functions: Any, thread_id: str, agent_id: str) -> float:
+    from azure.ai.agents.models import AgentEventHandler
+
+    started = time.monotonic()
+    first_token: List[float] = []
+
+    class Handler(AgentEventHandler):
+        def on_message_delta(self, delta: Any) -> None:
+            if not first_token:
+                first_token.append(time.monotonic() - started)
+
+        def on_thread_run(self, run: Any) -> None:
+            if run.status == "requires_action":
+                submit_outputs(client, functions, run, stream_handler=self)
+
+    with client.runs.stream(thread_id=thread_id, agent_id=agent_id, event_handler=Handler()) as stream:
+        stream.until_done()
+
+    return first_token[0]
+
+
+def measure(service: Any, strategy: Strategy, runs: int) -> Tuple[float, float]:
+    """Drive `runs` concurrent runs with a strategy
+
+    :returns: The mean number of requests per run, and the mean seconds to the first token of the reply
+    :rtype: Tuple[float, float]
+    """
+    from azure.ai.agents import AgentsClient
+    from azure.ai.agents.models import FunctionTool
+
+    functions = FunctionTool(functions={fetch_weather})
+
+    def one_run(_: int) -> float:
+        client = AgentsClient(endpoint=STAND_IN_ENVIRONMENT["PROJECT_ENDPOINT"], credential=OfflineCredential())
+        with client:
+            agent = client.create_agent(
+                model="stand-in-model", name="benchmark", instructions="-", tools=functions.definitions
+            )
+            thread = client.threads.create()
+            return strategy(client, functions, thread.id, agent.id)
+
+    before = sum(service.requests[r] for r in RUN_ROUTES)
+    with ThreadPoolExecutor(runs) as pool:
+        results = list(pool.map(one_run, range(runs)))
+    requests = sum(service.requests[r] for r in RUN_ROUTES) - before
+
+    return requests / runs, statistics.mean(results)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("processing_times", nargs="*", type=float, default=DEFAULT_PROCESSING_TIMES)
+    parser.add_argument("--runs", type=int, default=10, help="The number of concurrent runs per measurement")
+    args = parser.parse_args()
+
+    strategies: Dict[str, Tuple[Strategy, bool]] = {
+        "polling": (run_polling, False),
+        "polling+hint": (run_polling, True),
+        "streaming": (run_streaming, False),
+    }
+    settings = FakeAgentsSettings(tool_calls=True)
+    rows: List[List[str]] = []
+
+    with running_fake_agents_service(settings) as service, redirecting(service.url or ""):
+        for processing_time in args.processing_times:
+            settings.processing_time = processing_time
+
+            for name, (strategy, hint) in strategies.items():
+                settings.retry_after_hint = hint
+                requests, first_token = measure(service, strategy, args.runs)
+                rows.append([f"{processing_time:.1f}s", name, f"{requests:.1f}", f"{first_token * 1000:.0f}ms"])
+
+    header = ["phase time", "strategy", "requests/run", "first token after"]
+    widths = [max(len(r[i]) for r in [header, *rows]) for i in range(len(header))]
+    for row in [header, *rows]:
+        print("  ".join(cell.ljust(width) for cell, width in zip(row, widths)))
+
+
+if __name__ == "__main__":
+    main()
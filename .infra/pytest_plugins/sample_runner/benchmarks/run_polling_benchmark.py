@@ -0,0 +1,112 @@
+"""Compare polling a run once a second with `RunWaiter` (from the getting-started-agents samples)
+
+Usage: python benchmarks/run_polling_benchmark.py [--runs N] [PROCESSING_TIME ...]
+
+Runs are created through the Agents SDK against the local stand-in (see `fake_agents`), `--runs` at a
+time for each processing time, and waited for with each strategy:
+
+* `fixed`: the samples' previous loop, which sleeps one second before every `runs.get`
+* `backoff`: `RunWaiter`, with exponential backoff and jitter
+* `backoff+hint`: `RunWaiter`, with the stand-in sending a `retry-after-ms` hint
+
+For each, the mean number of polls per completed run and the mean time between the run completing
+on the stand-in and the client noticing are reported.
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+from pytest_sample_runner.fake_agents import FakeAgentsSettings, running_fake_agents_service
+from pytest_sample_runner.patching import OfflineCredential
+from pytest_sample_runner.traffic import STAND_IN_ENVIRONMENT, redirecting
+
+SAMPLES = Path(__file__).resolve().parents[4] / "samples" / "microsoft" / "python" / "getting-started-agents"
+sys.path.append(str(SAMPLES))
+
+from run_polling import PENDING_STATUSES, RunWaiter  # noqa: E402
+
+DEFAULT_PROCESSING_TIMES = (0.4, 1.3, 3.7, 12.5, 30.0)
+
+Strategy = Callable[[Any, str, str], int]
+"""Waits for a run, given a client, a thread ID and a run ID, and returns the number of polls"""
+
+
+def wait_fixed(client: Any, thread_id: str, run_id: str) -> int:
+    # A new run is always queued, so the loop starts by sleeping
+    polls = 0
+
+    while True:
+        time.sleep(1)
+        run = client.runs.get(thread_id=thread_id, run_id=run_id)
+        polls += 1
+
+        if run.status not in PENDING_STATUSES:
+            return polls
+
+
+def wait_backoff(client: Any, thread_id: str, run_id: str) -> int:
+    waiter = RunWaiter()
+    waiter.wait(client.runs.get, thread_id=thread_id, run_id=run_id)
+    return waiter.polls
+
+
+def measure(strategy: Strategy, processing_time: float, runs: int) -> Tuple[float, float]:
+    """Wait for `runs` concurrent runs with a strategy
+
+    :returns: The mean number of polls per run, and the mean seconds from completion to being noticed
+    :rtype: Tuple[float, float]
+    """
+    from azure.ai.agents import AgentsClient
+
+    def one_run(_: int) -> Tuple[int, float]:
+        client = AgentsClient(endpoint=STAND_IN_ENVIRONMENT["PROJECT_ENDPOINT"], credential=OfflineCredential())
+        with client:
+            agent = client.create_agent(model="stand-in-model", name="benchmark", instructions="-")
+            thread = client.threads.create()
+            started = time.monotonic()
+            run = client.runs.create(thread_id=thread.id, agent_id=agent.id)
+            polls = strategy(client, thread.id, run.id)
+            return polls, time.monotonic() - started - processing_time
+
+    with ThreadPoolExecutor(runs) as pool:
+        results = list(pool.map(one_run, range(runs)))
+
+    return statistics.mean(p for p, _ in results), statistics.mean(d for _, d in results)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("processing_times", nargs="*", type=float, default=DEFAULT_PROCESSING_TIMES)
+    parser.add_argument("--runs", type=int, default=10, help="The number of concurrent runs per measurement")
+    args = parser.parse_args()
+
+    strategies: Dict[str, Tuple[Strategy, bool]] = {
+        "fixed": (wait_fixed, False),
+        "backoff": (wait_backoff, False),
+        "backoff+hint": (wait_backoff, True),
+    }
+    settings = FakeAgentsSettings()
+    rows: List[List[str]] = []
+
+    with running_fake_agents_service(settings) as service, redirecting(service.url or ""):
+        for processing_time in args.processing_times:
+            settings.processing_time = processing_time
+
+            for name, (strategy, hint) in strategies.items():
+                settings.retry_after_hint = hint
+                polls, delay = measure(strategy, processing_time, args.runs)
+                rows.append([f"{processing_time:.1f}s", name, f"{polls:.1f}", f"{delay * 1000:.0f}ms"])
+
+    header = ["run time", "strategy", "polls/run", "noticed after"]
+    widths = [max(len(r[i]) for r in [header, *rows]) for i in range(len(header))]
+    for row in [header, *rows]:
+        print("  ".join(cell.ljust(width) for cell, width in zip(row, widths)))
+
+
+if __name__ == "__main__":
+    main()
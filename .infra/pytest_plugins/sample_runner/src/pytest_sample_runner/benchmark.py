@@ -0,0 +1,193 @@
+"""Benchmark samples against the Agents service stand-in, and compare with historical baselines
+
+Every sample runs `repeat` times with its traffic redirected to a local stand-in, one run at a
+time, so that every repetition is timed under the same conditions. The wall time
+percentiles and traffic counts of those runs are compared with the latest entry for the sample
+in a baseline file, and the sample fails if any of them regressed by more than the threshold.
+
+The baseline file is JSON, keeping a bounded history of entries per sample (newest last):
+
+    {"samples": {"samples/.../quickstart.py": [{"recorded_at": "...", "runs": 5, "wall_p50": 1.2, ...}]}}
+"""
+
+import json
+import math
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from .runners import SampleResult, SampleRunner
+
+COMPARED_METRICS = ("wall_p50", "wall_p95", "requests", "polls", "bytes")
+"""Metrics that fail the benchmark when they regress"""
+
+MIN_WALL_TIME_REGRESSION = 0.05
+"""Wall time regressions smaller than this many seconds are ignored as noise"""
+
+HISTORY_LENGTH = 20
+"""The number of entries kept per sample in the baseline file"""
+
+
+def percentile(values: Sequence[float], fraction: float) -> float:
+    """The nearest-rank percentile of a non-empty sequence
+
+    :param Sequence[float] values: The values
+    :param float fraction: The percentile as a fraction (e.g. 0.95)
+    :returns: The smallest value that is greater than or equal to `fraction` of the values
+    :rtype: float
+    """
+    ordered = sorted(values)
+    return ordered[max(math.ceil(fraction * len(ordered)) - 1, 0)]
+
+
+class Baseline:
+    """The historical benchmark results of every sample"""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.samples: Dict[str, List[Dict[str, Any]]] = {}
+
+        if path.exists():
+            self.samples = json.loads(path.read_text())["samples"]
+
+    def latest(self, key: str) -> Optional[Dict[str, Any]]:
+        history = self.samples.get(key)
+        return history[-1] if history else None
+
+    def add(self, key: str, entry: Dict[str, Any]) -> None:
+        self.samples.setdefault(key, []).append(entry)
+
+    def save(self) -> None:
+        samples = {k: v[-HISTORY_LENGTH:] for k, v in sorted(self.samples.items())}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_text(json.dumps({"samples": samples}, indent=2) + "\n")
+
+
+class BenchmarkRunner(SampleRunner):
+    """Runs every sample several times with another runner, and compares the results with a baseline
+
+    Samples aren't handed to the other runner ahead of time, so no repetition competes with other
+    samples running on a pool of workers.
+    """
+
+    def __init__(
+        self,
+        inner: SampleRunner,
+        repeat: int,
+        baseline: Baseline,
+        threshold: float,
+        root: Path,
+        save: bool = False,
+    ) -> None:
+        super().__init__()
+        self.inner = inner
+        self.repeat = repeat
+        self.baseline = baseline
+        self.threshold = threshold
+        self.root = root
+        self.save = save
+        self.entries: Dict[str, Dict[str, Any]] = {}
+
+    def prepare(self, paths: Iterable[Path]) -> None:
+        # Starting samples early would time the first repetition under load and the rest alone
+        pass
+
+    def execute(self, path: Path) -> SampleResult:
+        runs: List[SampleResult] = []
+        wall_times: List[float] = []
+
+        for _ in range(self.repeat):
+            start = time.perf_counter()
+            result = self.inner.execute(path)
+
+            if not result.passed:
+                return result
+
+            runs.append(result)
+            wall_times.append(result.wall_time if result.wall_time is not None else time.perf_counter() - start)
+
+        def median(metric: str) -> float:
+            return percentile([r.metrics.get(metric, 0.0) for r in runs], 0.5)
+
+        metrics = {
+            "wall_p50": percentile(wall_times, 0.5),
+            "wall_p95": percentile(wall_times, 0.95),
+            "requests": median("requests"),
+            "polls": median("polls"),
+            "bytes": median("bytes_sent") + median("bytes_received"),
+        }
+
+        key = self.key(path)
+        regressions = self.regressions(metrics, self.baseline.latest(key))
+        self.entries[key] = {
+            "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "runs": self.repeat,
+            **metrics,
+        }
+
+        return SampleResult(
+            path=path,
+            passed=not regressions,
+            output=runs[-1].output,
+            error="\n".join(["Benchmark regressed relative to the baseline:", *regressions]) if regressions else None,
+            wall_time=metrics["wall_p50"],
+            cpu_time=runs[-1].cpu_time,
+            max_rss=max((r.max_rss for r in runs if r.max_rss is not None), default=None),
+            import_time=runs[-1].import_time,
+            metrics=metrics,
+        )
+
+    def regressions(self, metrics: Dict[str, float], baseline: Optional[Dict[str, Any]]) -> List[str]:
+        """Describe the metrics that regressed by more than the threshold
+
+        :param Dict[str, float] metrics: The metrics of the current benchmark
+        :param Optional[Dict[str, Any]] baseline: The latest baseline entry, if any
+        :returns: A line per regressed metric
+        :rtype: List[str]
+        """
+        if baseline is None:
+            return []
+
+        regressions = []
+
+        for metric in COMPARED_METRICS:
+            value, previous = metrics[metric], baseline.get(metric)
+            if previous is None or value <= previous * (1 + self.threshold):
+                continue
+            if metric.startswith("wall_") and value - previous < MIN_WALL_TIME_REGRESSION:
+                continue
+
+            change = f"+{(value / previous - 1):.0%}" if previous else "new"
+            regressions.append(f"\t{metric}: {previous:g} -> {value:g} ({change}, threshold {self.threshold:.0%})")
+
+        return regressions
+
+    def key(self, path: Path) -> str:
+        """The name of a sample in the baseline file: its POSIX path relative to the root"""
+        try:
+            return path.resolve().relative_to(self.root.resolve()).as_posix()
+        except ValueError:
+            return path.resolve().as_posix()
+
+    def summary(self) -> List[str]:
+        lines = [f"benchmarked {len(self.entries)} samples, {self.repeat} runs each (baseline: {self.baseline.path})"]
+
+        for key, entry in self.entries.items():
+            lines.append(
+                f"p50 {entry['wall_p50']:.2f}s, p95 {entry['wall_p95']:.2f}s, {entry['requests']:g} requests,"
+                + f" {entry['polls']:g} polls, {entry['bytes']:g} bytes\t{key}"
+            )
+
+        if self.save:
+            lines.append(f"saved baseline to {self.baseline.path}")
+
+        return lines
+
+    def close(self) -> None:
+        self.inner.close()
+
+        if self.save and self.entries:
+            for key, entry in self.entries.items():
+                self.baseline.add(key, entry)
+            self.baseline.save()
@@ -0,0 +1,239 @@
+"""Record and replay the HTTP traffic between a sample and the Agents service
+
+While recording, every request the sample sends to an Agents service host goes out over the network
+as usual, and the response is appended to the sample's cassette. While replaying, those responses
+are served back from the cassette instead, so the sample runs offline:
+
+* `DefaultAzureCredential` is swapped for a credential that never requests a token
+* `time.sleep` returns immediately, so run polling loops don't wait for a server that isn't there
+* environment variables the samples require (e.g. `PROJECT_ENDPOINT`) default to the recorded values
+
+Cassettes are gzipped JSON files, one per sample. Only the response headers the SDKs act on are kept,
+and request headers and bodies are never stored.
+
+The interception hooks `requests`, which is the HTTP transport used by `azure-core`. Because samples
+may run in worker processes, the plugin configures this module through environment variables,
+which every kind of worker inherits.
+"""
+
+import base64
+import gzip
+import io
+import json
+import os
+import time
+from collections import defaultdict, deque
+from contextlib import ExitStack, contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, ContextManager, Deque, Dict, Iterator, List, Optional, Sequence
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from .patching import offline_credentials, patched, patched_environment
+
+MODE_ENV = "SAMPLE_CASSETTE_MODE"
+"""Either `record` or `replay`. Cassettes are not used when unset."""
+DIR_ENV = "SAMPLE_CASSETTE_DIR"
+"""The directory cassettes are stored in"""
+ROOT_ENV = "SAMPLE_CASSETTE_ROOT"
+"""Cassette names are derived from the sample's path relative to this directory"""
+HOSTS_ENV = "SAMPLE_CASSETTE_HOSTS"
+"""A comma separated list of host suffixes whose traffic is recorded"""
+
+RECORD = "record"
+REPLAY = "replay"
+
+DEFAULT_HOSTS = (".services.ai.azure.com", ".cognitiveservices.azure.com", ".openai.azure.com", ".api.azureml.ms")
+"""Hosts of the Agents service. Traffic to other hosts (e.g. Entra ID token requests) is never recorded."""
+
+RECORDED_HEADERS = ("content-type", "retry-after", "retry-after-ms", "location", "operation-location")
+RECORDED_ENVIRONMENT = ("PROJECT_ENDPOINT", "MODEL_DEPLOYMENT_NAME")
+
+
+class CassetteError(Exception):
+    """Raised when a replayed sample makes a request that isn't in its cassette"""
+
+
+@dataclass
+class Interaction:
+    """A single recorded request/response pair"""
+
+    key: str
+    status: int
+    headers: Dict[str, str]
+    body: str
+    binary: bool = False
+
+    @property
+    def content(self) -> bytes:
+        return base64.b64decode(self.body) if self.binary else self.body.encode("utf-8")
+
+
+def request_key(method: str, url: str) -> str:
+    """Identify a request by its method, path and (sorted) query, ignoring scheme and host
+
+    :param str method: The HTTP method
+    :param str url: The request URL
+    :returns: A key such as `GET /api/projects/p/threads/thread_1/runs/run_1?api-version=v1`
+    :rtype: str
+    """
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return f"{method.upper()} {parts.path}{'?' + query if query else ''}"
+
+
+class Cassette:
+    """The recorded traffic of one sample"""
+
+    def __init__(self, path: Path, hosts: Sequence[str] = DEFAULT_HOSTS) -> None:
+        self.path = path
+        self.hosts = tuple(hosts)
+        self.interactions: List[Interaction] = []
+        self.environment: Dict[str, str] = {}
+
+    def load(self) -> "Cassette":
+        if not self.path.exists():
+            raise CassetteError(f"No cassette has been recorded at {self.path}")
+
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+
+        self.interactions = [Interaction(**i) for i in data["interactions"]]
+        self.environment = data["environment"]
+        return self
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = {"environment": self.environment, "interactions": [asdict(i) for i in self.interactions]}
+
+        with gzip.open(self.path, "wt", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+
+    def is_recorded_host(self, url: str) -> bool:
+        host = urlsplit(url).hostname or ""
+        return any(host == suffix.lstrip(".") or host.endswith(suffix) for suffix in self.hosts)
+
+    @contextmanager
+    def recording(self) -> Iterator["Cassette"]:
+        """Record the traffic sent to the Agents service within the block, then save the cassette"""
+        from requests.adapters import HTTPAdapter
+
+        original_send = HTTPAdapter.send
+        cassette = self
+
+        def send(adapter: HTTPAdapter, request: Any, *args: Any, **kwargs: Any) -> Any:
+            response = original_send(adapter, request, *args, **kwargs)
+
+            if cassette.is_recorded_host(request.url):
+                content = response.content
+                # The body has been decoded, so it must no longer be described as compressed
+                response.headers.pop("content-encoding", None)
+                response.headers.pop("content-length", None)
+                response.raw = io.BytesIO(content)
+                cassette.interactions.append(make_interaction(request_key(request.method, request.url), response))
+
+            return response
+
+        self.environment = {k: os.environ[k] for k in RECORDED_ENVIRONMENT if k in os.environ}
+        HTTPAdapter.send = send
+        try:
+            yield self
+        finally:
+            HTTPAdapter.send = original_send
+            self.save()
+
+    @contextmanager
+    def replaying(self) -> Iterator["Cassette"]:
+        """Serve the recorded traffic to the sample within the block, without touching the network"""
+        from requests.adapters import HTTPAdapter
+
+        queues: Dict[str, Deque[Interaction]] = defaultdict(deque)
+        for interaction in self.interactions:
+            queues[interaction.key].append(interaction)
+
+        def send(adapter: HTTPAdapter, request: Any, *args: Any, **kwargs: Any) -> Any:
+            key = request_key(request.method, request.url)
+
+            if not queues[key]:
+                raise CassetteError(f"No recorded response left for '{key}' in {self.path}")
+
+            return make_response(request, queues[key].popleft())
+
+        with ExitStack() as stack:
+            stack.enter_context(patched(HTTPAdapter, "send", send))
+            stack.enter_context(patched(time, "sleep", lambda seconds: None))
+            stack.enter_context(patched_environment(self.environment))
+            stack.enter_context(offline_credentials())
+            yield self
+
+
+def make_interaction(key: str, response: Any) -> Interaction:
+    """Convert a `requests.Response` into an Interaction"""
+    headers = {k: response.headers[k] for k in RECORDED_HEADERS if k in response.headers}
+
+    try:
+        return Interaction(key=key, status=response.status_code, headers=headers, body=response.content.decode("utf-8"))
+    except UnicodeDecodeError:
+        body = base64.b64encode(response.content).decode("ascii")
+        return Interaction(key=key, status=response.status_code, headers=headers, body=body, binary=True)
+
+
+def make_response(request: Any, interaction: Interaction) -> Any:
+    """Convert an Interaction into a `requests.Response` for the given request"""
+    from requests import Response
+    from requests.structures import CaseInsensitiveDict
+
+    content = interaction.content
+    response = Response()
+    response.status_code = interaction.status
+    response.headers = CaseInsensitiveDict({**interaction.headers, "content-length": str(len(content))})
+    response.url = request.url
+    response.request = request
+    response.encoding = "utf-8"
+    response.raw = io.BytesIO(content)
+    response._content = content
+    response._content_consumed = True
+    return response
+
+
+def cassette_path(sample: Path, directory: Path, root: Optional[Path] = None) -> Path:
+    """Get the path of the cassette for a sample
+
+    :param Path sample: The path to the sample
+    :param Path directory: The directory cassettes are stored in
+    :param Optional[Path] root: Cassettes are named after the sample's path relative to this directory
+    :returns: E.g. `<directory>/samples__microsoft__python__quickstart.py.json.gz`
+    :rtype: Path
+    """
+    sample = sample.resolve()
+
+    try:
+        relative = sample.relative_to(root.resolve()) if root is not None else Path(sample.name)
+    except ValueError:
+        relative = Path(sample.name)
+
+    return directory / ("__".join(relative.parts) + ".json.gz")
+
+
+def cassette_for(sample: Path) -> Optional[ContextManager[Cassette]]:
+    """Record or replay a sample's traffic, as configured by the environment
+
+    :param Path sample: The path to the sample
+    :returns: A context manager to run the sample in, or None if cassettes are disabled
+    :rtype: Optional[ContextManager[Cassette]]
+    """
+    mode = os.environ.get(MODE_ENV)
+
+    if not mode:
+        return None
+
+    root = os.environ.get(ROOT_ENV)
+    hosts = [h.strip() for h in os.environ.get(HOSTS_ENV, "").split(",") if h.strip()] or DEFAULT_HOSTS
+    cassette = Cassette(cassette_path(sample, Path(os.environ[DIR_ENV]), Path(root) if root else None), hosts)
+
+    if mode == RECORD:
+        return cassette.recording()
+    if mode == REPLAY:
+        return cassette.load().replaying()
+
+    raise ValueError(f"Unknown cassette mode '{mode}'")
@@ -0,0 +1,97 @@
+"""Entry point of the child interpreter used by `SubprocessRunner`
+
+Usage: python -m pytest_sample_runner.child <sample path> <report path>
+
+Runs the sample, then writes a JSON report with the formatted traceback (if any), the time spent
+importing modules, the CPU time and the peak RSS of the process, and the sample's traffic counts
+to the report path.
+"""
+
+import builtins
+import json
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator, List, Optional
+
+from .runners import run_sample_guarded
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss() -> Optional[int]:
+    """Get the peak resident set size of this process in bytes, if the platform reports it"""
+    if resource is None:
+        return None
+
+    return rss_bytes(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+
+def rss_bytes(max_rss: int) -> int:
+    """Convert `ru_maxrss` to bytes. Linux reports kilobytes, macOS reports bytes."""
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+@contextmanager
+def timed_imports() -> Iterator[List[float]]:
+    """Measure the wall time spent in import statements executed within the block
+
+    Nested imports (i.e. those triggered while another import is running) are only counted once,
+    as part of the outermost import.
+
+    :returns: A single element list holding the elapsed time in seconds, updated in place
+    :rtype: Iterator[List[float]]
+    """
+    elapsed = [0.0]
+    depth = 0
+    original_import = builtins.__import__
+
+    def timed_import(*args: Any, **kwargs: Any) -> Any:
+        nonlocal depth
+
+        if depth:
+            return original_import(*args, **kwargs)
+
+        depth += 1
+        start = time.perf_counter()
+        try:
+            return original_import(*args, **kwargs)
+        finally:
+            elapsed[0] += time.perf_counter() - start
+            depth -= 1
+
+    builtins.__import__ = timed_import
+    try:
+        yield elapsed
+    finally:
+        builtins.__import__ = original_import
+
+
+def run_and_report(sample_path: str, report_path: str) -> None:
+    """Run a sample as if it were invoked as `python <sample>`, and write a JSON report about the run
+
+    :param str sample_path: The path to the sample
+    :param str report_path: The path the report is written to
+    """
+    sys.argv = [sample_path]
+    sys.path[0] = str(Path(sample_path).parent)
+
+    with timed_imports() as import_time:
+        error, metrics = run_sample_guarded(Path(sample_path))
+
+    report = {
+        "error": error,
+        "import_time": import_time[0],
+        "cpu_time": time.process_time(),
+        "max_rss": peak_rss(),
+        "metrics": metrics,
+    }
+    Path(report_path).write_text(json.dumps(report))
+
+
+if __name__ == "__main__":
+    run_and_report(*sys.argv[1:3])
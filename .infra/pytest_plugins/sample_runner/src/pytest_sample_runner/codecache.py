@@ -0,0 +1,177 @@
+"""Cache the compiled code of samples, so that repeated runs skip reading, parsing and compiling them
+
+Code objects are kept in memory for the lifetime of the process, and optionally as marshal files in
+a directory shared by every worker (and by later sessions). An entry is reused while the sample's
+mtime and size are unchanged; otherwise the source is re-read and hashed, and only recompiled if its
+content actually changed.
+
+Marshal files are named after a hash of the sample's path and source, plus the interpreter's cache
+tag (e.g. `cpython-311`), since the marshal format and bytecode differ between Python versions.
+"""
+
+import hashlib
+import io
+import marshal
+import os
+import sys
+import tempfile
+import types
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional
+
+DIR_ENV = "SAMPLE_CODE_CACHE_DIR"
+"""The directory marshal files are stored in. Code is only cached in memory when unset."""
+
+RUN_NAME = "<run_path>"
+"""The module name samples run as, which is `runpy.run_path`'s default"""
+
+
+@dataclass
+class CacheEntry:
+    mtime_ns: int
+    size: int
+    digest: str
+    code: types.CodeType
+
+
+class CodeCache:
+    """Compiled code of sample scripts, keyed by the hash of their path and content"""
+
+    def __init__(self, directory: Optional[Path] = None) -> None:
+        self.directory = directory
+        self.entries: Dict[Path, CacheEntry] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path: Path) -> types.CodeType:
+        """Get the compiled code of a script, compiling it if it isn't cached or changed
+
+        :param Path path: The path to the script
+        :returns: The code object, with the script's path as its filename
+        :rtype: types.CodeType
+        """
+        path = path.resolve()
+        stat = path.stat()
+        entry = self.entries.get(path)
+
+        if entry is not None and (entry.mtime_ns, entry.size) == (stat.st_mtime_ns, stat.st_size):
+            self.hits += 1
+            return entry.code
+
+        with io.open_code(str(path)) as f:
+            source = f.read()
+
+        digest = hashlib.sha256(os.fsencode(path) + b"\0" + source).hexdigest()
+
+        if entry is not None and entry.digest == digest:
+            # Touched, but not changed
+            self.hits += 1
+        else:
+            entry = CacheEntry(stat.st_mtime_ns, stat.st_size, digest, self.load_or_compile(path, source, digest))
+
+        entry.mtime_ns, entry.size = stat.st_mtime_ns, stat.st_size
+        self.entries[path] = entry
+        return entry.code
+
+    def load_or_compile(self, path: Path, source: bytes, digest: str) -> types.CodeType:
+        marshal_path = self.marshal_path(digest)
+
+        if marshal_path is not None:
+            try:
+                code = marshal.loads(marshal_path.read_bytes())
+            except (OSError, EOFError, ValueError, TypeError):
+                pass
+            else:
+                if isinstance(code, types.CodeType):
+                    self.hits += 1
+                    return code
+
+        self.misses += 1
+        code = compile(source, str(path), "exec", dont_inherit=True)
+
+        if marshal_path is not None:
+            write_atomically(marshal_path, marshal.dumps(code))
+
+        return code
+
+    def marshal_path(self, digest: str) -> Optional[Path]:
+        if self.directory is None or sys.implementation.cache_tag is None:
+            return None
+
+        return self.directory / f"{digest}.{sys.implementation.cache_tag}.marshal"
+
+
+def write_atomically(path: Path, data: bytes) -> None:
+    """Write a file via a temporary file and a rename, so concurrent readers never see a partial file
+
+    Failures are ignored, since the file is only a cache.
+    """
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, temp = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(temp, path)
+        except BaseException:
+            os.unlink(temp)
+            raise
+    except OSError:
+        pass
+
+
+_code_cache: Optional[CodeCache] = None
+
+
+def code_cache() -> CodeCache:
+    """Get this process's code cache, storing marshal files in the directory configured by the environment"""
+    global _code_cache
+
+    directory = os.environ.get(DIR_ENV)
+    directory_path = Path(directory) if directory else None
+
+    if _code_cache is None or _code_cache.directory != directory_path:
+        _code_cache = CodeCache(directory_path)
+
+    return _code_cache
+
+
+def run_code(code: types.CodeType, path: Path) -> None:
+    """Execute a sample's code the way `runpy.run_path` executes a script
+
+    As with `run_path`'s default `run_name`, the code runs as `<run_path>` (not `__main__`, so
+    `if __name__ == "__main__":` blocks are skipped) in a fresh module that is temporarily added
+    to `sys.modules`, with `sys.argv[0]` set to the script's path. As when running `python <sample>`,
+    the script's directory is put first on `sys.path` while it runs, so that it can import the
+    modules next to it (e.g. `run_polling`).
+
+    :param types.CodeType code: The sample's compiled code
+    :param Path path: The path to the sample script
+    """
+    module = types.ModuleType(RUN_NAME)
+    module.__dict__.update(__file__=str(path), __cached__=None, __loader__=None, __package__="", __spec__=None)
+
+    saved_module = sys.modules.get(RUN_NAME)
+    saved_argv0 = sys.argv[0] if sys.argv else None
+    directory = str(path.parent)
+    sys.modules[RUN_NAME] = module
+    sys.path.insert(0, directory)
+    if sys.argv:
+        sys.argv[0] = str(path)
+    else:
+        sys.argv.append(str(path))
+
+    try:
+        exec(code, module.__dict__)
+    finally:
+        if saved_module is None:
+            sys.modules.pop(RUN_NAME, None)
+        else:
+            sys.modules[RUN_NAME] = saved_module
+        if saved_argv0 is None:
+            sys.argv.pop(0)
+        else:
+            sys.argv[0] = saved_argv0
+        if directory in sys.path:
+            sys.path.remove(directory)
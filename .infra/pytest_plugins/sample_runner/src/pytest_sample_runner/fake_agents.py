@@ -0,0 +1,768 @@
+"""A local, in-memory stand-in for the Agents service
+
+Implements the subset of the REST API used by the samples, so that their polling and tool
+execution paths can be exercised (and load tested) without a Foundry project:
+
+* agents: create, get, delete (`/assistants`)
+* threads: create (`/threads`)
+* messages: create, list (`/threads/{id}/messages`)
+* runs: create, get, submit_tool_outputs, cancel (`/threads/{id}/runs`), streamed or not
+* run steps: list (`/threads/{id}/runs/{id}/steps`)
+
+Routes are matched on the end of the request path, so any project endpoint prefix works.
+
+Runs advance through `queued` -> `in_progress` -> (`requires_action` ->  `in_progress` ->) `completed`
+based on the configured timings. Run state is computed lazily whenever a run is read, so no
+task or timer is kept per run and thousands of concurrent runs cost nothing but memory.
+
+When a run is created (or its tool outputs submitted) with `"stream": true`, the response is a
+`text/event-stream` of the run's events instead: its status changes as they happen, then either the
+`thread.run.requires_action` event or the assistant's message (as `thread.message.delta` chunks)
+followed by `thread.run.completed`, and finally `done`.
+
+Usage: python -m pytest_sample_runner.fake_agents --port 8080 --processing-time 0.5 --tool-calls
+"""
+
+import argparse
+import asyncio
+import http
+import json
+import math
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+Response = Tuple[int, Dict[str, str], Any]
+"""A status code, extra headers and a JSON serializable body (or an `EventStream`)"""
+
+DELTA_WORDS = 3
+"""The number of words of a message sent in each `thread.message.delta` event"""
+
+
+@dataclass
+class EventStream:
+    """A response body of server-sent events, written out as they are produced"""
+
+    events: AsyncIterator[Tuple[str, Any]]
+    """The name and data (JSON serializable, or a string sent as is) of each event"""
+
+
+@dataclass
+class FakeAgentsSettings:
+    """How the stand-in service behaves"""
+
+    latency: float = 0.0
+    """Seconds added to every response"""
+    queue_time: float = 0.0
+    """Seconds a run spends `queued`"""
+    processing_time: float = 0.5
+    """Seconds a run spends `in_progress` before it completes or requires action"""
+    tool_calls: bool = False
+    """Whether runs of agents with function tools stop in `requires_action` to request a call to each function"""
+    rate_limit: Optional[float] = None
+    """Requests per second accepted before responding with 429 Too Many Requests"""
+    retry_after_hint: bool = False
+    """Whether a queued or in progress run is returned with a `retry-after-ms` header saying when it next changes"""
+
+
+class ServiceError(Exception):
+    """Converted into an error response"""
+
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+@dataclass
+class RunState:
+    """A run and the bookkeeping needed to advance it"""
+
+    body: Dict[str, Any]
+    phase_started: float
+    tool_calls_done: bool = False
+    steps: List[Dict[str, Any]] = field(default_factory=list)
+
+
+def make_id(prefix: str) -> str:
+    return f"{prefix}_{uuid.uuid4().hex[:24]}"
+
+
+class FakeAgentsService:
+    """The stand-in service. Holds all state in memory."""
+
+    def __init__(self, settings: Optional[FakeAgentsSettings] = None) -> None:
+        self.settings = settings or FakeAgentsSettings()
+        self.agents: Dict[str, Dict[str, Any]] = {}
+        self.threads: Dict[str, Dict[str, Any]] = {}
+        self.messages: Dict[str, List[Dict[str, Any]]] = {}
+        self.runs: Dict[str, RunState] = {}
+        self.requests: Counter = Counter()
+        """The number of requests served, by route name"""
+        self.bytes_received = 0
+        self.bytes_sent = 0
+        self.tokens = self.settings.rate_limit or 0.0
+        self.tokens_updated = time.monotonic()
+        self.url: Optional[str] = None
+        self.routes: List[Tuple[str, "re.Pattern[str]", Callable[..., Response]]] = [
+            ("POST", re.compile(r"/assistants$"), self.create_agent),
+            ("GET", re.compile(r"/assistants/(?P<agent_id>[^/]+)$"), self.get_agent),
+            ("DELETE", re.compile(r"/assistants/(?P<agent_id>[^/]+)$"), self.delete_agent),
+            ("POST", re.compile(r"/threads$"), self.create_thread),
+            ("POST", re.compile(r"/threads/(?P<thread_id>[^/]+)/messages$"), self.create_message),
+            ("GET", re.compile(r"/threads/(?P<thread_id>[^/]+)/messages$"), self.list_messages),
+            ("POST", re.compile(r"/threads/(?P<thread_id>[^/]+)/runs$"), self.create_run),
+            ("GET", re.compile(r"/threads/(?P<thread_id>[^/]+)/runs/(?P<run_id>[^/]+)$"), self.get_run),
+            (
+                "POST",
+                re.compile(r"/threads/(?P<thread_id>[^/]+)/runs/(?P<run_id>[^/]+)/submit_tool_outputs$"),
+                self.submit_tool_outputs,
+            ),
+            ("POST", re.compile(r"/threads/(?P<thread_id>[^/]+)/runs/(?P<run_id>[^/]+)/cancel$"), self.cancel_run),
+            ("GET", re.compile(r"/threads/(?P<thread_id>[^/]+)/runs/(?P<run_id>[^/]+)/steps$"), self.list_run_steps),
+        ]
+
+    # ----------------------------------------------------------------------------------------------
+    # Request handling
+    # ----------------------------------------------------------------------------------------------
+
+    async def handle(self, method: str, target: str, body: bytes) -> Response:
+        """Route a request to its handler
+
+        :param str method: The HTTP method
+        :param str target: The request target (path and query)
+        :param bytes body: The request body
+        :returns: The response
+        :rtype: Response
+        """
+        if self.settings.latency:
+            await asyncio.sleep(self.settings.latency)
+
+        retry_after = self.take_token()
+        if retry_after is not None:
+            self.requests["throttled"] += 1
+            return error_response(429, "Rate limit exceeded", {"Retry-After": str(math.ceil(retry_after))})
+
+        parts = urlsplit(target)
+        query = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+
+        for route_method, pattern, handler in self.routes:
+            match = pattern.search(parts.path)
+            if route_method != method or match is None:
+                continue
+
+            self.requests[handler.__name__] += 1
+            try:
+                payload = json.loads(body) if body else {}
+                return handler(payload, query, **match.groupdict())
+            except ServiceError as e:
+                return error_response(e.status, str(e))
+            except ValueError as e:
+                return error_response(400, f"Invalid request: {e}")
+
+        self.requests["not_found"] += 1
+        return error_response(404, f"No route for {method} {parts.path}")
+
+    def take_token(self) -> Optional[float]:
+        """Apply the rate limit (a token bucket holding up to one second of requests)
+
+        :returns: None if the request is allowed, otherwise the seconds until the next token is available
+        :rtype: Optional[float]
+        """
+        rate = self.settings.rate_limit
+        if not rate:
+            return None
+
+        now = time.monotonic()
+        self.tokens = min(rate, self.tokens + (now - self.tokens_updated) * rate)
+        self.tokens_updated = now
+
+        if self.tokens < 1:
+            return (1 - self.tokens) / rate
+
+        self.tokens -= 1
+        return None
+
+    # ----------------------------------------------------------------------------------------------
+    # Agents, threads and messages
+    # ----------------------------------------------------------------------------------------------
+
+    def create_agent(self, payload: Dict[str, Any], query: Dict[str, str]) -> Response:
+        agent = {
+            "id": make_id("asst"),
+            "object": "assistant",
+            "created_at": int(time.time()),
+            "name": payload.get("name"),
+            "description": payload.get("description"),
+            "model": payload.get("model"),
+            "instructions": payload.get("instructions"),
+            "tools": payload.get("tools") or [],
+            "tool_resources": payload.get("tool_resources") or {},
+            "temperature": payload.get("temperature", 1.0),
+            "top_p": payload.get("top_p", 1.0),
+            "response_format": payload.get("response_format"),
+            "metadata": payload.get("metadata") or {},
+        }
+        self.agents[agent["id"]] = agent
+        return 200, {}, agent
+
+    def get_agent(self, payload: Dict[str, Any], query: Dict[str, str], agent_id: str) -> Response:
+        return 200, {}, self.find(self.agents, agent_id, "Agent")
+
+    def delete_agent(self, payload: Dict[str, Any], query: Dict[str, str], agent_id: str) -> Response:
+        self.find(self.agents, agent_id, "Agent")
+        del self.agents[agent_id]
+        return 200, {}, {"id": agent_id, "object": "assistant.deleted", "deleted": True}
+
+    def create_thread(self, payload: Dict[str, Any], query: Dict[str, str]) -> Response:
+        thread = {
+            "id": make_id("thread"),
+            "object": "thread",
+            "created_at": int(time.time()),
+            "tool_resources": payload.get("tool_resources") or {},
+            "metadata": payload.get("metadata") or {},
+        }
+        self.threads[thread["id"]] = thread
+        self.messages[thread["id"]] = []
+
+        for message in payload.get("messages") or []:
+            self.add_message(thread["id"], message.get("role", "user"), message.get("content", ""))
+
+        return 200, {}, thread
+
+    def create_message(self, payload: Dict[str, Any], query: Dict[str, str], thread_id: str) -> Response:
+        self.find(self.threads, thread_id, "Thread")
+        return 200, {}, self.add_message(thread_id, payload.get("role", "user"), payload.get("content", ""))
+
+    def list_messages(self, payload: Dict[str, Any], query: Dict[str, str], thread_id: str) -> Response:
+        self.find(self.threads, thread_id, "Thread")
+        messages = self.messages[thread_id]
+        run_id = query.get("run_id")
+
+        if run_id is not None:
+            messages = [m for m in messages if m["run_id"] == run_id]
+
+        return 200, {}, list_response(messages, query)
+
+    def add_message(
+        self, thread_id: str, role: str, content: Any, agent_id: Optional[str] = None, run_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        text = content if isinstance(content, str) else json.dumps(content)
+        message = {
+            "id": make_id("msg"),
+            "object": "thread.message",
+            "created_at": int(time.time()),
+            "thread_id": thread_id,
+            "status": "completed",
+            "incomplete_details": None,
+            "completed_at": int(time.time()),
+            "incomplete_at": None,
+            "role": role,
+            "content": [{"type": "text", "text": {"value": text, "annotations": []}}],
+            "assistant_id": agent_id,
+            "run_id": run_id,
+            "attachments": [],
+            "metadata": {},
+        }
+        self.messages[thread_id].append(message)
+        return message
+
+    # ----------------------------------------------------------------------------------------------
+    # Runs
+    # ----------------------------------------------------------------------------------------------
+
+    def create_run(self, payload: Dict[str, Any], query: Dict[str, str], thread_id: str) -> Response:
+        self.find(self.threads, thread_id, "Thread")
+        agent = self.find(self.agents, payload.get("assistant_id", ""), "Agent")
+
+        for message in payload.get("additional_messages") or []:
+            self.add_message(thread_id, message.get("role", "user"), message.get("content", ""))
+
+        now = int(time.time())
+        run = {
+            "id": make_id("run"),
+            "object": "thread.run",
+            "thread_id": thread_id,
+            "assistant_id": agent["id"],
+            "status": "queued",
+            "required_action": None,
+            "last_error": None,
+            "model": payload.get("model") or agent["model"],
+            "instructions": payload.get("instructions") or agent["instructions"],
+            "tools": payload.get("tools") or agent["tools"],
+            "created_at": now,
+            "expires_at": now + 600,
+            "started_at": None,
+            "completed_at": None,
+            "cancelled_at": None,
+            "failed_at": None,
+            "incomplete_details": None,
+            "usage": None,
+            "temperature": payload.get("temperature", agent["temperature"]),
+            "top_p": payload.get("top_p", agent["top_p"]),
+            "max_prompt_tokens": payload.get("max_prompt_tokens"),
+            "max_completion_tokens": payload.get("max_completion_tokens"),
+            "truncation_strategy": payload.get("truncation_strategy"),
+            "tool_choice": payload.get("tool_choice"),
+            "response_format": payload.get("response_format"),
+            "metadata": payload.get("metadata") or {},
+            "tool_resources": agent["tool_resources"],
+            "parallel_tool_calls": payload.get("parallel_tool_calls", True),
+        }
+        self.runs[run["id"]] = RunState(body=run, phase_started=time.monotonic())
+
+        if payload.get("stream"):
+            return 200, {}, EventStream(self.run_events(run["id"], created=True))
+
+        return 200, {}, self.advance(run["id"])
+
+    def get_run(self, payload: Dict[str, Any], query: Dict[str, str], thread_id: str, run_id: str) -> Response:
+        run = self.advance(self.find_run(thread_id, run_id)["id"])
+        return 200, self.retry_after_headers(run_id), run
+
+    def submit_tool_outputs(
+        self, payload: Dict[str, Any], query: Dict[str, str], thread_id: str, run_id: str
+    ) -> Response:
+        run = self.find_run(thread_id, run_id)
+        state = self.runs[run_id]
+        self.advance(run_id)
+
+        if run["status"] != "requires_action":
+            raise ServiceError(400, f"Run {run_id} is '{run['status']}', not 'requires_action'")
+
+        outputs = {o.get("tool_call_id"): o.get("output") for o in payload.get("tool_outputs") or []}
+        tool_calls = run["required_action"]["submit_tool_outputs"]["tool_calls"]
+
+        missing = [c["id"] for c in tool_calls if c["id"] not in outputs]
+        if missing:
+            raise ServiceError(400, f"Missing outputs for tool calls {', '.join(missing)}")
+
+        state.steps.append(
+            self.make_step(
+                run,
+                "tool_calls",
+                {
+                    "type": "tool_calls",
+                    "tool_calls": [
+                        {**c, "function": {**c["function"], "output": outputs[c["id"]]}} for c in tool_calls
+                    ],
+                },
+            )
+        )
+        run.update(status="in_progress", required_action=None)
+        state.tool_calls_done = True
+        state.phase_started = time.monotonic()
+
+        if payload.get("stream"):
+            return 200, {}, EventStream(self.run_events(run_id, created=False))
+
+        return 200, {}, run
+
+    def cancel_run(self, payload: Dict[str, Any], query: Dict[str, str], thread_id: str, run_id: str) -> Response:
+        run = self.find_run(thread_id, run_id)
+        self.advance(run_id)
+
+        if run["status"] in ("queued", "in_progress", "requires_action"):
+            run.update(status="cancelling", required_action=None)
+
+        return 200, {}, run
+
+    def list_run_steps(self, payload: Dict[str, Any], query: Dict[str, str], thread_id: str, run_id: str) -> Response:
+        self.find_run(thread_id, run_id)
+        self.advance(run_id)
+        return 200, {}, list_response(self.runs[run_id].steps, query)
+
+    def advance(self, run_id: str) -> Dict[str, Any]:
+        """Move a run through as many states as the time elapsed since its last transition allows
+
+        :param str run_id: The ID of the run
+        :returns: The up to date run
+        :rtype: Dict[str, Any]
+        """
+        state = self.runs[run_id]
+        run = state.body
+        settings = self.settings
+
+        while True:
+            elapsed = time.monotonic() - state.phase_started
+
+            # The next phase starts when this one was due to end, not when the run happened to be read
+            if run["status"] == "queued" and elapsed >= settings.queue_time:
+                run.update(status="in_progress", started_at=int(time.time()))
+                state.phase_started += settings.queue_time
+            elif run["status"] == "in_progress" and elapsed >= settings.processing_time:
+                state.phase_started += settings.processing_time
+                tool_calls = self.requested_tool_calls(run) if not state.tool_calls_done else []
+
+                if tool_calls:
+                    run.update(
+                        status="requires_action",
+                        required_action={
+                            "type": "submit_tool_outputs",
+                            "submit_tool_outputs": {"tool_calls": tool_calls},
+                        },
+                    )
+                else:
+                    self.complete(run)
+            elif run["status"] == "cancelling":
+                run.update(status="cancelled", cancelled_at=int(time.time()))
+            else:
+                return run
+
+    def time_to_next_change(self, run_id: str) -> Optional[float]:
+        """Seconds until a run next changes state on its own, or None if it is waiting for the client or done"""
+        state = self.runs[run_id]
+        duration = {"queued": self.settings.queue_time, "in_progress": self.settings.processing_time}.get(
+            state.body["status"]
+        )
+
+        if duration is None:
+            return None
+
+        return max(duration - (time.monotonic() - state.phase_started), 0.0)
+
+    def retry_after_headers(self, run_id: str) -> Dict[str, str]:
+        """The hint telling clients when the run will next change state, if hints are enabled and it will"""
+        remaining = self.time_to_next_change(run_id)
+
+        if not self.settings.retry_after_hint or remaining is None:
+            return {}
+
+        return {"retry-after-ms": str(math.ceil(remaining * 1000))}
+
+    async def run_events(self, run_id: str, created: bool) -> AsyncIterator[Tuple[str, Any]]:
+        """The events of a streamed run, until it requires action or has finished
+
+        :param str run_id: The ID of the run
+        :param bool created: Whether the run was just created, and so starts with `thread.run.created`
+        :returns: The name and data of each event, as the run advances
+        :rtype: AsyncIterator[Tuple[str, Any]]
+        """
+        run = self.runs[run_id].body
+        reported = None
+
+        if created:
+            yield "thread.run.created", dict(run)
+
+        while True:
+            self.advance(run_id)
+
+            if run["status"] != reported:
+                reported = run["status"]
+
+                if reported == "completed":
+                    for event in self.message_events(run):
+                        yield event
+
+                yield f"thread.run.{reported}", dict(run)
+
+            # Cancelling is resolved by `advance`, so the run is either pending on a timer, waiting or done
+            delay = self.time_to_next_change(run_id)
+            if delay is None:
+                break
+
+            await asyncio.sleep(delay)
+
+        yield "done", "[DONE]"
+
+    def message_events(self, run: Dict[str, Any]) -> Iterator[Tuple[str, Any]]:
+        """The events streaming a completed run's message, and then its last step"""
+        step = self.runs[run["id"]].steps[-1]
+        message_id = step["step_details"]["message_creation"]["message_id"]
+        message = next(m for m in self.messages[run["thread_id"]] if m["id"] == message_id)
+        words = message["content"][0]["text"]["value"].split(" ")
+
+        yield "thread.message.created", {**message, "status": "in_progress", "content": [], "completed_at": None}
+
+        for start in range(0, len(words), DELTA_WORDS):
+            value = " ".join(words[start : start + DELTA_WORDS]) + (" " if start + DELTA_WORDS < len(words) else "")
+            content = [{"index": 0, "type": "text", "text": {"value": value, "annotations": []}}]
+            delta = {"id": message_id, "object": "thread.message.delta", "delta": {"content": content}}
+            yield "thread.message.delta", delta
+
+        yield "thread.message.completed", message
+        yield "thread.run.step.completed", step
+
+    def requested_tool_calls(self, run: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """The tool calls a run requests: one per function tool, if tool calls are enabled"""
+        if not self.settings.tool_calls:
+            return []
+
+        return [
+            {
+                "id": make_id("call"),
+                "type": "function",
+                "function": {
+                    "name": tool["function"]["name"],
+                    "arguments": json.dumps(placeholder_arguments(tool["function"].get("parameters") or {})),
+                },
+            }
+            for tool in run["tools"]
+            if tool.get("type") == "function"
+        ]
+
+    def complete(self, run: Dict[str, Any]) -> None:
+        message = self.add_message(
+            run["thread_id"],
+            "assistant",
+            "This is a response from the local Agents service stand-in.",
+            agent_id=run["assistant_id"],
+            run_id=run["id"],
+        )
+        details = {"type": "message_creation", "message_creation": {"message_id": message["id"]}}
+        self.runs[run["id"]].steps.append(self.make_step(run, "message_creation", details))
+        run.update(
+            status="completed",
+            completed_at=int(time.time()),
+            usage={"prompt_tokens": 10, "completion_tokens": 10, "total_tokens": 20},
+        )
+
+    def make_step(self, run: Dict[str, Any], step_type: str, details: Dict[str, Any]) -> Dict[str, Any]:
+        now = int(time.time())
+        return {
+            "id": make_id("step"),
+            "object": "thread.run.step",
+            "type": step_type,
+            "assistant_id": run["assistant_id"],
+            "thread_id": run["thread_id"],
+            "run_id": run["id"],
+            "status": "completed",
+            "step_details": details,
+            "last_error": None,
+            "created_at": now,
+            "expired_at": None,
+            "completed_at": now,
+            "cancelled_at": None,
+            "failed_at": None,
+            "usage": None,
+            "metadata": {},
+        }
+
+    def find(self, collection: Dict[str, Dict[str, Any]], key: str, kind: str) -> Dict[str, Any]:
+        if key not in collection:
+            raise ServiceError(404, f"{kind} {key} not found")
+
+        return collection[key]
+
+    def find_run(self, thread_id: str, run_id: str) -> Dict[str, Any]:
+        state = self.runs.get(run_id)
+
+        if state is None or state.body["thread_id"] != thread_id:
+            raise ServiceError(404, f"Run {run_id} not found in thread {thread_id}")
+
+        return state.body
+
+    # ----------------------------------------------------------------------------------------------
+    # HTTP
+    # ----------------------------------------------------------------------------------------------
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serve HTTP/1.1 requests on a (keep-alive) connection until the client closes it"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    return
+
+                method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                status, extra_headers, payload = await self.handle(method, target, body)
+                self.bytes_received += len(request_line) + len(body)
+
+                if isinstance(payload, EventStream):
+                    await self.write_event_stream(writer, status, extra_headers, payload)
+                else:
+                    content = json.dumps(payload).encode("utf-8")
+                    content_headers = {"Content-Type": "application/json", "Content-Length": str(len(content))}
+                    head = response_head(status, {**content_headers, **extra_headers})
+                    writer.write(head + content)
+                    await writer.drain()
+                    self.bytes_sent += len(head) + len(content)
+
+                if headers.get("connection", "").lower() == "close":
+                    return
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            return
+        except asyncio.CancelledError:
+            # The service is shutting down
+            return
+        finally:
+            writer.close()
+
+    async def write_event_stream(
+        self, writer: asyncio.StreamWriter, status: int, headers: Dict[str, str], stream: EventStream
+    ) -> None:
+        """Write server-sent events as they are produced, each in its own chunk"""
+        head = response_head(status, {"Content-Type": "text/event-stream", "Transfer-Encoding": "chunked", **headers})
+        writer.write(head)
+        self.bytes_sent += len(head)
+
+        async for name, data in stream.events:
+            text = data if isinstance(data, str) else json.dumps(data)
+            event = f"event: {name}\ndata: {text}\n\n".encode("utf-8")
+            chunk = f"{len(event):x}\r\n".encode("ascii") + event + b"\r\n"
+            writer.write(chunk)
+            await writer.drain()
+            self.bytes_sent += len(chunk)
+
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+        self.bytes_sent += 5
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> asyncio.AbstractServer:
+        """Start listening. The URL of the service is available as `url` once this returns."""
+        server = await asyncio.start_server(self.handle_connection, host, port, backlog=4096)
+        bound_host, bound_port = server.sockets[0].getsockname()[:2]
+        self.url = f"http://{bound_host}:{bound_port}"
+        return server
+
+
+def placeholder_arguments(parameters: Dict[str, Any]) -> Dict[str, Any]:
+    """Make up arguments for the required parameters of a function tool
+
+    :param Dict[str, Any] parameters: The JSON schema of the function's parameters
+    :returns: A placeholder value of the right type for each required parameter
+    :rtype: Dict[str, Any]
+    """
+    placeholders = {"string": "placeholder", "integer": 1, "number": 1.0, "boolean": True, "array": [], "object": {}}
+    properties = parameters.get("properties") or {}
+
+    return {
+        name: placeholders.get(properties.get(name, {}).get("type", "string"), "placeholder")
+        for name in parameters.get("required") or []
+    }
+
+
+def response_head(status: int, headers: Dict[str, str]) -> bytes:
+    """The status line and headers of a response"""
+    status_line = f"HTTP/1.1 {status} {http.HTTPStatus(status).phrase}\r\n"
+    return "".join([status_line, *(f"{k}: {v}\r\n" for k, v in headers.items()), "\r\n"]).encode("latin-1")
+
+
+def error_response(status: int, message: str, headers: Optional[Dict[str, str]] = None) -> Response:
+    code = http.HTTPStatus(status).phrase.lower().replace(" ", "_")
+    return status, headers or {}, {"error": {"code": code, "message": message}}
+
+
+def list_response(items: List[Dict[str, Any]], query: Dict[str, str]) -> Dict[str, Any]:
+    """Page a list of objects the way the service does (`order` defaults to `desc`)"""
+    items = items if query.get("order") == "asc" else items[::-1]
+
+    after, before = query.get("after"), query.get("before")
+    ids = [i["id"] for i in items]
+    if after in ids:
+        items = items[ids.index(after) + 1 :]
+    if before in ids:
+        items = items[: [i["id"] for i in items].index(before)]
+
+    limit = int(query.get("limit", 20))
+    page = items[:limit]
+
+    return {
+        "object": "list",
+        "data": page,
+        "first_id": page[0]["id"] if page else None,
+        "last_id": page[-1]["id"] if page else None,
+        "has_more": len(items) > limit,
+    }
+
+
+@contextmanager
+def running_fake_agents_service(
+    settings: Optional[FakeAgentsSettings] = None, host: str = "127.0.0.1", port: int = 0
+) -> Iterator[FakeAgentsService]:
+    """Run the stand-in service on a background thread for the duration of the block
+
+    :param Optional[FakeAgentsSettings] settings: How the service behaves
+    :param str host: The interface to listen on
+    :param int port: The port to listen on (0 picks a free port)
+    :returns: The running service. Its `url` attribute holds the base URL.
+    :rtype: Iterator[FakeAgentsService]
+    """
+    service = FakeAgentsService(settings)
+    loop = asyncio.new_event_loop()
+    started = threading.Event()
+    stopped: "asyncio.Future[None]" = loop.create_future()
+
+    async def serve() -> None:
+        server = await service.start(host, port)
+        started.set()
+        async with server:
+            await stopped
+
+        # Close connections the clients left open
+        connections = asyncio.all_tasks() - {asyncio.current_task()}
+        for connection in connections:
+            connection.cancel()
+        await asyncio.gather(*connections, return_exceptions=True)
+
+    thread = threading.Thread(target=loop.run_until_complete, args=(serve(),), name="fake-agents", daemon=True)
+    thread.start()
+    started.wait()
+
+    try:
+        yield service
+    finally:
+        loop.call_soon_threadsafe(stopped.set_result, None)
+        thread.join()
+        loop.close()
+
+
+async def serve_forever(service: FakeAgentsService, host: str, port: int) -> None:
+    server = await service.start(host, port)
+    print(f"Agents service stand-in listening on {service.url}", flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a local stand-in for the Agents service.")
+    parser.add_argument("--host", default="127.0.0.1", help="The interface to listen on")
+    parser.add_argument("--port", type=int, default=8080, help="The port to listen on")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--queue-time", type=float, default=0.0, help="Seconds a run spends queued")
+    parser.add_argument(
+        "--processing-time",
+        type=float,
+        default=0.5,
+        help="Seconds a run spends in progress before it completes or requires action",
+    )
+    parser.add_argument(
+        "--tool-calls",
+        action="store_true",
+        help="Make runs of agents with function tools request a call to each function",
+    )
+    parser.add_argument("--rate-limit", type=float, help="Requests per second accepted before responding with 429")
+    parser.add_argument(
+        "--retry-after-hint",
+        action="store_true",
+        help="Tell clients polling a queued or in progress run how long until it changes state",
+    )
+    args = parser.parse_args()
+
+    settings = FakeAgentsSettings(
+        latency=args.latency,
+        queue_time=args.queue_time,
+        processing_time=args.processing_time,
+        tool_calls=args.tool_calls,
+        rate_limit=args.rate_limit,
+        retry_after_hint=args.retry_after_hint,
+    )
+    try:
+        asyncio.run(serve_forever(FakeAgentsService(settings), args.host, args.port))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,255 @@
+"""A "fork server" backend that keeps the SDK imports of a warm interpreter
+
+The runner starts a single zygote process (`python -m pytest_sample_runner.forkserver <modules>`)
+that imports the modules shared by most samples once, then forks a copy of itself for every sample.
+Each sample still runs in its own process, but skips the cost of importing the Azure SDKs again.
+
+The runner and the zygote talk over the zygote's stdin/stdout using one JSON object per line:
+
+* zygote -> runner, once: `{"preload_time": float, "preloaded": [str], "failed": [str]}`
+* runner -> zygote: `{"id": int, "path": str, "output": str, "report": str, "timeout": float | null}`
+* zygote -> runner: `{"id": int, "returncode": int, "cpu_time": float, "max_rss": int, "timed_out": bool}`
+"""
+
+import importlib
+import itertools
+import json
+import os
+import select
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+from .child import rss_bytes, run_and_report
+from .runners import ConcurrentRunner, SampleResult
+
+DEFAULT_PRELOAD = ("azure.identity", "azure.ai.projects", "azure.ai.agents", "azure.ai.agents.models")
+"""Modules imported by the zygote before it starts forking"""
+
+
+class ForkServerRunner(ConcurrentRunner):
+    """Runs every sample in a process forked from a zygote that has already imported `preload`.
+
+    Only available on platforms that support `os.fork`.
+    """
+
+    def __init__(self, workers: int = 1, timeout: Optional[float] = None, preload: Sequence[str] = DEFAULT_PRELOAD):
+        super().__init__(ThreadPoolExecutor(max_workers=max(workers, 1)))
+        self.timeout = timeout
+        self.tmp = tempfile.TemporaryDirectory()
+        self.ids = itertools.count()
+        self.lock = threading.Lock()
+        self.waiting: Dict[int, "Future[Dict[str, Any]]"] = {}
+        self.server = subprocess.Popen(
+            [sys.executable, "-m", "pytest_sample_runner.forkserver", *preload],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+            bufsize=1,
+        )
+
+        ready = json.loads(self.server.stdout.readline() or "null")
+        if ready is None:
+            raise RuntimeError(f"Sample fork server exited with code {self.server.wait()} during start up")
+
+        self.preload_time: float = ready["preload_time"]
+        self.preloaded: List[str] = ready["preloaded"]
+        self.failed_preloads: List[str] = ready["failed"]
+
+        threading.Thread(target=self.read_responses, name="sample-fork-server-reader", daemon=True).start()
+
+    def submit(self, path: Path) -> "Future[SampleResult]":
+        return self.executor.submit(self.run_forked, path)
+
+    def run_forked(self, path: Path) -> SampleResult:
+        """Ask the zygote to fork and run a sample, and wait for the fork to exit
+
+        :param Path path: The path to the sample
+        :returns: The result of the run
+        :rtype: SampleResult
+        """
+        request_id = next(self.ids)
+        output_path = Path(self.tmp.name, f"{request_id}.out")
+        report_path = Path(self.tmp.name, f"{request_id}.json")
+        response: "Future[Dict[str, Any]]" = Future()
+        request = {
+            "id": request_id,
+            "path": str(path),
+            "output": str(output_path),
+            "report": str(report_path),
+            "timeout": self.timeout,
+        }
+
+        start = time.perf_counter()
+        with self.lock:
+            self.waiting[request_id] = response
+            self.server.stdin.write(json.dumps(request) + "\n")
+            self.server.stdin.flush()
+
+        status = response.result()
+        wall_time = time.perf_counter() - start
+
+        output = output_path.read_text(errors="replace") if output_path.exists() else ""
+
+        try:
+            report = json.loads(report_path.read_text())
+        except (OSError, ValueError):
+            report = {"error": f"Sample process exited with code {status['returncode']}"}
+
+        if status["timed_out"]:
+            report["error"] = f"Timed out after {self.timeout}s"
+
+        return SampleResult(
+            path=path,
+            passed=report.get("error") is None,
+            output=output,
+            error=report.get("error"),
+            wall_time=wall_time,
+            cpu_time=status["cpu_time"],
+            max_rss=status["max_rss"],
+            import_time=report.get("import_time"),
+            metrics=report.get("metrics") or {},
+        )
+
+    def read_responses(self) -> None:
+        """Hand the zygote's responses to the threads waiting on them, until the zygote exits"""
+        for line in self.server.stdout:
+            status = json.loads(line)
+            with self.lock:
+                self.waiting.pop(status["id"]).set_result(status)
+
+        with self.lock:
+            for response in self.waiting.values():
+                response.set_exception(RuntimeError("Sample fork server exited unexpectedly"))
+            self.waiting.clear()
+
+    def summary(self) -> List[str]:
+        lines = [f"fork server preloaded {', '.join(self.preloaded) or 'nothing'} in {self.preload_time:.2f}s"]
+
+        if self.failed_preloads:
+            lines.append(f"fork server could not import {', '.join(self.failed_preloads)}")
+
+        return lines
+
+    def close(self) -> None:
+        super().close()
+        self.server.stdin.close()
+        self.server.wait()
+        self.tmp.cleanup()
+
+
+@dataclass
+class Fork:
+    """A sample process forked by the zygote"""
+
+    request_id: int
+    deadline: Optional[float]
+    timed_out: bool = False
+
+
+def preload_modules(modules: Sequence[str]) -> Dict[str, Any]:
+    """Import modules into the zygote
+
+    :param Sequence[str] modules: The names of the modules to import
+    :returns: The "ready" message sent to the runner
+    :rtype: Dict[str, Any]
+    """
+    preloaded, failed = [], []
+    start = time.perf_counter()
+
+    for module in modules:
+        try:
+            importlib.import_module(module)
+            preloaded.append(module)
+        except ImportError:
+            failed.append(module)
+
+    return {"preload_time": time.perf_counter() - start, "preloaded": preloaded, "failed": failed}
+
+
+def run_fork(request: Dict[str, Any], protocol_fd: int) -> None:
+    """Run a sample in a freshly forked process. Never returns.
+
+    :param Dict[str, Any] request: The request received from the runner
+    :param int protocol_fd: The zygote's response channel, which the sample must not inherit
+    """
+    try:
+        os.close(protocol_fd)
+        output_fd = os.open(request["output"], os.O_WRONLY | os.O_CREAT | os.O_TRUNC)
+        os.dup2(os.open(os.devnull, os.O_RDONLY), 0)
+        os.dup2(output_fd, 1)
+        os.dup2(output_fd, 2)
+        run_and_report(request["path"], request["report"])
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(0)
+
+
+def serve(modules: Sequence[str]) -> None:
+    """Run the zygote: preload modules, then fork a process per request until stdin is closed
+
+    :param Sequence[str] modules: The names of the modules to import before forking
+    """
+    # Keep the protocol channel away from anything that writes to stdout
+    responses = os.fdopen(os.dup(sys.stdout.fileno()), "w", buffering=1)
+    os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+
+    responses.write(json.dumps(preload_modules(modules)) + "\n")
+
+    requests_fd = sys.stdin.fileno()
+    buffer = b""
+    eof = False
+    forks: Dict[int, Fork] = {}
+
+    while not eof or forks:
+        if not eof and select.select([requests_fd], [], [], 0.01)[0]:
+            data = os.read(requests_fd, 1 << 16)
+            eof = not data
+            *lines, buffer = (buffer + data).split(b"\n")
+
+            for line in lines:
+                request = json.loads(line)
+                sys.stdout.flush()
+                sys.stderr.flush()
+
+                pid = os.fork()
+                if pid == 0:
+                    run_fork(request, responses.fileno())
+
+                timeout = request.get("timeout")
+                forks[pid] = Fork(request["id"], time.monotonic() + timeout if timeout is not None else None)
+        elif eof:
+            time.sleep(0.01)
+
+        now = time.monotonic()
+        for pid, fork in forks.items():
+            if fork.deadline is not None and not fork.timed_out and now > fork.deadline:
+                os.kill(pid, signal.SIGKILL)
+                fork.timed_out = True
+
+        while forks:
+            pid, status, usage = os.wait4(-1, os.WNOHANG)
+            if pid == 0:
+                break
+
+            fork = forks.pop(pid)
+            response = {
+                "id": fork.request_id,
+                "returncode": os.waitstatus_to_exitcode(status),
+                "cpu_time": usage.ru_utime + usage.ru_stime,
+                "max_rss": rss_bytes(usage.ru_maxrss),
+                "timed_out": fork.timed_out,
+            }
+            responses.write(json.dumps(response) + "\n")
+
+
+if __name__ == "__main__":
+    serve(sys.argv[1:])
@@ -0,0 +1,65 @@
+"""Helpers for temporarily changing the world a sample runs in"""
+
+import os
+import time
+from contextlib import ExitStack, contextmanager
+from typing import Any, Dict, Iterator
+
+
+class OfflineCredential:
+    """Stands in for `DefaultAzureCredential` when a sample doesn't talk to the real service,
+    so that no token is ever requested"""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        pass
+
+    def get_token(self, *scopes: str, **kwargs: Any) -> Any:
+        from azure.core.credentials import AccessToken
+
+        return AccessToken("offline-token", int(time.time()) + 3600)
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> "OfflineCredential":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        pass
+
+
+@contextmanager
+def patched(target: Any, name: str, value: Any) -> Iterator[None]:
+    """Temporarily replace an attribute"""
+    original = getattr(target, name)
+    setattr(target, name, value)
+    try:
+        yield
+    finally:
+        setattr(target, name, original)
+
+
+@contextmanager
+def patched_environment(defaults: Dict[str, str]) -> Iterator[None]:
+    """Temporarily set environment variables that aren't already set"""
+    added = [k for k in defaults if k not in os.environ]
+    os.environ.update({k: defaults[k] for k in added})
+    try:
+        yield
+    finally:
+        for k in added:
+            os.environ.pop(k, None)
+
+
+@contextmanager
+def offline_credentials() -> Iterator[None]:
+    """Make `azure.identity.DefaultAzureCredential` an `OfflineCredential` (if azure-identity is installed)"""
+    with ExitStack() as stack:
+        try:
+            import azure.identity
+        except ImportError:
+            pass
+        else:
+            stack.enter_context(patched(azure.identity, "DefaultAzureCredential", OfflineCredential))
+
+        yield
@@ -0,0 +1,335 @@
+import argparse
+import os
+from contextlib import ExitStack
+from pathlib import Path
+from typing import Dict, Optional
+
+import pytest
+
+from . import cassette, codecache, traffic
+from .benchmark import Baseline, BenchmarkRunner
+from .fake_agents import FakeAgentsSettings, running_fake_agents_service
+from .forkserver import DEFAULT_PRELOAD, ForkServerRunner
+from .runners import InProcessRunner, ProcessPoolRunner, SampleRunner, SubprocessRunner
+
+SAMPLE_RUNNER_KEY = pytest.StashKey[SampleRunner]()
+"""A Stash key to the SampleRunner used to execute sample scripts"""
+
+SAVED_ENVIRONMENT_KEY = pytest.StashKey[Dict[str, Optional[str]]]()
+"""A Stash key to the values of the environment variables the plugin overrode"""
+
+STAND_IN_KEY = pytest.StashKey[ExitStack]()
+"""A Stash key to the ExitStack that stops the Agents service stand-in"""
+
+WORKERS_OPTION = "--sample-workers"
+ISOLATION_OPTION = "--sample-isolation"
+TIMEOUT_OPTION = "--sample-timeout"
+FORK_SERVER_OPTION = "--sample-fork-server"
+PRELOAD_OPTION = "--sample-preload"
+CASSETTES_OPTION = "--sample-cassettes"
+CASSETTE_DIR_OPTION = "--sample-cassette-dir"
+CASSETTE_HOST_OPTION = "--sample-cassette-host"
+CODE_CACHE_OPTION = "--sample-code-cache"
+BENCHMARK_OPTION = "--sample-benchmark"
+BASELINE_OPTION = "--sample-benchmark-baseline"
+THRESHOLD_OPTION = "--sample-benchmark-threshold"
+SAVE_BASELINE_OPTION = "--sample-benchmark-save"
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    group = parser.getgroup("sample_runner", "sample script execution")
+    group.addoption(
+        WORKERS_OPTION,
+        type=worker_count,
+        default=0,
+        help=(
+            "Run samples concurrently on this many worker processes, or 'auto' for one per CPU."
+            + " The default (0) runs samples one at a time in the pytest process."
+        ),
+    )
+    group.addoption(
+        ISOLATION_OPTION,
+        action="store_true",
+        help=(
+            "Run every sample in a fresh child interpreter, and report its wall time, CPU time and peak RSS."
+            + f" Combine with {WORKERS_OPTION} to run several children at once."
+        ),
+    )
+    group.addoption(
+        FORK_SERVER_OPTION,
+        action="store_true",
+        help=(
+            f"Like {ISOLATION_OPTION}, but fork every sample from a warm interpreter that has already imported the"
+            + " Azure SDKs, and report how long each sample spent importing modules. Requires os.fork."
+        ),
+    )
+    group.addoption(
+        PRELOAD_OPTION,
+        action="append",
+        metavar="MODULE",
+        help=f"A module for {FORK_SERVER_OPTION} to import before forking. Defaults to {', '.join(DEFAULT_PRELOAD)}.",
+    )
+    group.addoption(
+        CASSETTES_OPTION,
+        choices=(cassette.RECORD, cassette.REPLAY),
+        help=(
+            f"'{cassette.RECORD}' the HTTP traffic between each sample and the Agents service to a cassette, or"
+            + f" '{cassette.REPLAY}' it from a previously recorded cassette without touching the network."
+        ),
+    )
+    group.addoption(
+        CASSETTE_DIR_OPTION,
+        type=Path,
+        help="The directory cassettes are stored in. Defaults to .infra/sample_cassettes under the rootdir.",
+    )
+    group.addoption(
+        CASSETTE_HOST_OPTION,
+        action="append",
+        metavar="SUFFIX",
+        help=(
+            "Record traffic to hosts ending with this suffix (repeatable)."
+            + f" Defaults to the Agents service hosts: {', '.join(cassette.DEFAULT_HOSTS)}."
+        ),
+    )
+    group.addoption(
+        CODE_CACHE_OPTION,
+        type=Path,
+        metavar="DIR",
+        help=(
+            "Also cache the compiled code of samples as marshal files in this directory, so that worker processes"
+            + " and later sessions skip compiling unchanged samples. Compiled code is always cached in memory."
+        ),
+    )
+    group.addoption(
+        BENCHMARK_OPTION,
+        type=int,
+        metavar="N",
+        help=(
+            "Run every sample N times against a local Agents service stand-in, and fail samples whose wall time"
+            + " percentiles, request count, poll count or bytes transferred regressed relative to the baseline."
+        ),
+    )
+    group.addoption(
+        BASELINE_OPTION,
+        type=Path,
+        help="The benchmark baseline file. Defaults to .infra/sample_benchmarks.json under the rootdir.",
+    )
+    group.addoption(
+        THRESHOLD_OPTION,
+        type=float,
+        default=0.2,
+        metavar="FRACTION",
+        help="How much worse than the baseline (e.g. 0.2 for 20%%) a benchmark metric may get. Defaults to 0.2.",
+    )
+    group.addoption(
+        SAVE_BASELINE_OPTION,
+        action="store_true",
+        help=f"Add the results of {BENCHMARK_OPTION} to the baseline file.",
+    )
+    group.addoption(
+        TIMEOUT_OPTION,
+        type=float,
+        help=(
+            "Kill a sample that runs for longer than this many seconds."
+            + f" Requires {ISOLATION_OPTION} or {FORK_SERVER_OPTION}."
+        ),
+    )
+
+
+def pytest_configure(config: pytest.Config) -> None:
+    # Validate that mutually exclusive options haven't been provided
+    for mutually_exclusive_options in ((ISOLATION_OPTION, FORK_SERVER_OPTION), (CASSETTES_OPTION, BENCHMARK_OPTION)):
+        if sum(bool(config.getoption(opt_var(o))) for o in mutually_exclusive_options) > 1:
+            raise pytest.UsageError(f"{' and '.join(mutually_exclusive_options)} are mutually exclusive")
+
+    isolated = config.getoption(opt_var(ISOLATION_OPTION)) or config.getoption(opt_var(FORK_SERVER_OPTION))
+    if config.getoption(opt_var(TIMEOUT_OPTION)) is not None and not isolated:
+        raise pytest.UsageError(f"{TIMEOUT_OPTION} requires {ISOLATION_OPTION} or {FORK_SERVER_OPTION}")
+
+    if config.getoption(opt_var(FORK_SERVER_OPTION)) and not hasattr(os, "fork"):
+        raise pytest.UsageError(f"{FORK_SERVER_OPTION} is not supported on this platform")
+
+    benchmark = config.getoption(opt_var(BENCHMARK_OPTION))
+    if benchmark is not None and benchmark < 1:
+        raise pytest.UsageError(f"{BENCHMARK_OPTION} must be at least 1")
+
+    environment = get_environment(config)
+
+    if benchmark is not None:
+        stand_in = ExitStack()
+        service = stand_in.enter_context(running_fake_agents_service(FakeAgentsSettings(tool_calls=True)))
+        config.stash[STAND_IN_KEY] = stand_in
+        environment[traffic.STAND_IN_ENV] = service.url
+
+    # Set before creating the runner, so that every worker process inherits the configuration
+    config.stash[SAVED_ENVIRONMENT_KEY] = set_environment(environment)
+    config.stash[SAMPLE_RUNNER_KEY] = make_runner(config)
+
+
+def pytest_unconfigure(config: pytest.Config) -> None:
+    runner = config.stash.get(SAMPLE_RUNNER_KEY, None)
+
+    if runner is not None:
+        runner.close()
+        del config.stash[SAMPLE_RUNNER_KEY]
+
+    stand_in = config.stash.get(STAND_IN_KEY, None)
+
+    if stand_in is not None:
+        stand_in.close()
+        del config.stash[STAND_IN_KEY]
+
+    saved_environment = config.stash.get(SAVED_ENVIRONMENT_KEY, None)
+
+    if saved_environment is not None:
+        set_environment(saved_environment)
+        del config.stash[SAVED_ENVIRONMENT_KEY]
+
+
+def pytest_terminal_summary(terminalreporter: pytest.TerminalReporter, config: pytest.Config) -> None:
+    runner = config.stash.get(SAMPLE_RUNNER_KEY, None)
+    measured = [r for r in runner.results if r.wall_time is not None] if runner is not None else []
+
+    if not measured:
+        return
+
+    terminalreporter.write_sep("=", "sample resource usage")
+
+    for line in runner.summary():
+        terminalreporter.write_line(line)
+
+    for result in sorted(measured, key=lambda r: r.wall_time, reverse=True):
+        terminalreporter.write_line(f"{result.describe_resources()}\t{result.path}")
+
+
+def make_runner(config: pytest.Config) -> SampleRunner:
+    """Create the runner selected by the commandline options
+
+    :param pytest.Config config: The pytest config
+    :returns: The runner
+    :rtype: SampleRunner
+    """
+    runner = make_execution_runner(config)
+    repeat = config.getoption(opt_var(BENCHMARK_OPTION))
+
+    if repeat is None:
+        return runner
+
+    baseline = config.getoption(opt_var(BASELINE_OPTION)) or Path(config.rootpath, ".infra", "sample_benchmarks.json")
+    return BenchmarkRunner(
+        runner,
+        repeat=repeat,
+        baseline=Baseline(baseline),
+        threshold=config.getoption(opt_var(THRESHOLD_OPTION)),
+        root=config.rootpath,
+        save=config.getoption(opt_var(SAVE_BASELINE_OPTION)),
+    )
+
+
+def make_execution_runner(config: pytest.Config) -> SampleRunner:
+    """Create the runner that executes samples, as selected by the commandline options
+
+    :param pytest.Config config: The pytest config
+    :returns: The runner
+    :rtype: SampleRunner
+    """
+    workers = config.getoption(opt_var(WORKERS_OPTION))
+    timeout = config.getoption(opt_var(TIMEOUT_OPTION))
+
+    if config.getoption(opt_var(FORK_SERVER_OPTION)):
+        preload = config.getoption(opt_var(PRELOAD_OPTION)) or DEFAULT_PRELOAD
+        return ForkServerRunner(workers=workers, timeout=timeout, preload=preload)
+
+    if config.getoption(opt_var(ISOLATION_OPTION)):
+        return SubprocessRunner(workers=workers, timeout=timeout)
+
+    if workers > 0:
+        return ProcessPoolRunner(workers)
+
+    return InProcessRunner()
+
+
+def get_environment(config: pytest.Config) -> Dict[str, Optional[str]]:
+    """Get the environment variables that configure sample execution inside of worker processes
+
+    :param pytest.Config config: The pytest config
+    :returns: A mapping of variable names to values (None for unset variables)
+    :rtype: Dict[str, Optional[str]]
+    """
+    environment: Dict[str, Optional[str]] = {}
+    code_cache_dir = config.getoption(opt_var(CODE_CACHE_OPTION))
+
+    if code_cache_dir is not None:
+        environment[codecache.DIR_ENV] = str(code_cache_dir.resolve())
+
+    mode = config.getoption(opt_var(CASSETTES_OPTION))
+
+    if mode is None:
+        return environment
+
+    directory = config.getoption(opt_var(CASSETTE_DIR_OPTION)) or Path(config.rootpath, ".infra", "sample_cassettes")
+    hosts = config.getoption(opt_var(CASSETTE_HOST_OPTION))
+
+    environment.update(
+        {
+            cassette.MODE_ENV: mode,
+            cassette.DIR_ENV: str(directory.resolve()),
+            cassette.ROOT_ENV: str(config.rootpath),
+            cassette.HOSTS_ENV: ",".join(hosts) if hosts else None,
+        }
+    )
+    return environment
+
+
+def set_environment(values: Dict[str, Optional[str]]) -> Dict[str, Optional[str]]:
+    """Set (or unset, for None) environment variables
+
+    :param Dict[str, Optional[str]] values: A mapping of variable names to values
+    :returns: The previous values of the variables
+    :rtype: Dict[str, Optional[str]]
+    """
+    previous = {k: os.environ.get(k) for k in values}
+
+    for k, v in values.items():
+        if v is None:
+            os.environ.pop(k, None)
+        else:
+            os.environ[k] = v
+
+    return previous
+
+
+def get_runner(config: pytest.Config) -> SampleRunner:
+    """Get the runner that executes sample scripts for this session
+
+    :param pytest.Config config: The pytest config
+    :returns: The runner
+    :rtype: SampleRunner
+    """
+    return config.stash[SAMPLE_RUNNER_KEY]
+
+
+def worker_count(arg: str) -> int:
+    """Converts a commandline argument to a number of worker processes"""
+    if arg == "auto":
+        return os.cpu_count() or 1
+
+    try:
+        count = int(arg)
+    except ValueError:
+        count = -1
+
+    if count < 0:
+        raise argparse.ArgumentTypeError(f"'{arg}' is not a non-negative integer or 'auto'")
+
+    return count
+
+
+def opt_var(s: str) -> str:
+    """Return the name of the variable associated with a given commandline option
+
+    :param str s: A string in the form of a commandline option (e.g. `--hello-world`)
+    :returns: The variable associated with the commandline option (e.g. `hello_world`)
+    :rtype: str
+    """
+    return s.lstrip("-").replace("-", "_")
@@ -0,0 +1,296 @@
+import io
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+from abc import ABC, abstractmethod
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import redirect_stderr, redirect_stdout
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .codecache import code_cache, run_code
+from .traffic import sample_traffic
+
+
+@dataclass
+class SampleResult:
+    """The outcome of running a single sample script"""
+
+    path: Path
+    passed: bool
+    output: str = ""
+    error: Optional[str] = None
+    wall_time: Optional[float] = None
+    """Elapsed time, in seconds"""
+    cpu_time: Optional[float] = None
+    """User + system CPU time, in seconds"""
+    max_rss: Optional[int] = None
+    """Peak resident set size, in bytes"""
+    import_time: Optional[float] = None
+    """Wall time spent in the sample's import statements, in seconds"""
+    metrics: Dict[str, float] = field(default_factory=dict)
+    """Counts of the sample's HTTP traffic, if it was recorded, replayed or redirected"""
+
+    def describe_resources(self) -> str:
+        """Describe the resources used by the run, e.g. `wall 1.20s, cpu 0.31s, peak rss 85.2MB, imports 0.80s`"""
+        parts = []
+
+        if self.wall_time is not None:
+            parts.append(f"wall {self.wall_time:.2f}s")
+        if self.cpu_time is not None:
+            parts.append(f"cpu {self.cpu_time:.2f}s")
+        if self.max_rss is not None:
+            parts.append(f"peak rss {self.max_rss / (1 << 20):.1f}MB")
+        if self.import_time is not None:
+            parts.append(f"imports {self.import_time:.2f}s")
+
+        return ", ".join(parts)
+
+
+class SampleError(Exception):
+    """Raised when a sample that was run outside of the pytest process fails"""
+
+    def __init__(self, result: SampleResult) -> None:
+        super().__init__(result.error)
+        self.result = result
+
+
+def run_sample(path: Path, metrics: Optional[Dict[str, float]] = None) -> None:
+    """Execute a sample script in its own namespace, in the current process
+
+    The sample runs as `runpy.run_path` would run it (as `<run_path>`, so `if __name__ == "__main__":` blocks
+    are skipped), but its compiled code is cached (see `codecache`).
+    If configured, the sample's HTTP traffic is recorded, replayed or redirected (see `traffic`).
+
+    :param Path path: The path to the sample script
+    :param Optional[Dict[str, float]] metrics: Updated with counts of the sample's traffic, if any,
+        even if the sample fails
+    """
+    code = code_cache().get(path)
+
+    with sample_traffic(path) as stats:
+        try:
+            run_code(code, path)
+        finally:
+            if stats is not None and metrics is not None:
+                metrics.update(stats.as_dict())
+
+
+def run_sample_guarded(path: Path) -> Tuple[Optional[str], Dict[str, float]]:
+    """Execute a sample script, converting any exception it raises into a formatted traceback
+
+    A sample that exits via `sys.exit(0)` (or `sys.exit()`) is considered to have passed.
+
+    :param Path path: The path to the sample script
+    :returns: The formatted traceback if the sample failed (otherwise None), and the sample's metrics
+    :rtype: Tuple[Optional[str], Dict[str, float]]
+    """
+    metrics: Dict[str, float] = {}
+
+    try:
+        run_sample(path, metrics)
+    except SystemExit as e:
+        if e.code not in (0, None):
+            return traceback.format_exc(), metrics
+    except Exception:
+        return traceback.format_exc(), metrics
+
+    return None, metrics
+
+
+def run_sample_captured(path: Path) -> SampleResult:
+    """Execute a sample script, capturing its output and any exception it raises
+
+    :param Path path: The path to the sample script
+    :returns: The result of the run
+    :rtype: SampleResult
+    """
+    output = io.StringIO()
+    start_wall, start_cpu = time.perf_counter(), time.process_time()
+
+    with redirect_stdout(output), redirect_stderr(output):
+        error, metrics = run_sample_guarded(path)
+
+    return SampleResult(
+        path=path,
+        passed=error is None,
+        output=output.getvalue(),
+        error=error,
+        wall_time=time.perf_counter() - start_wall,
+        cpu_time=time.process_time() - start_cpu,
+        metrics=metrics,
+    )
+
+
+class SampleRunner(ABC):
+    """A strategy for executing the sample scripts collected by conftest.py"""
+
+    def __init__(self) -> None:
+        self.results: List[SampleResult] = []
+
+    def prepare(self, paths: Iterable[Path]) -> None:
+        """Called once collection has finished with the samples that are going to run, in order.
+
+        Runners may use this to start work ahead of `run` being called.
+
+        :param Iterable[Path] paths: The paths to the samples
+        """
+
+    def run(self, path: Path) -> SampleResult:
+        """Run a single sample, wait for it to finish and record its result.
+
+        :param Path path: The path to the sample
+        :returns: The result of the run
+        :rtype: SampleResult
+        """
+        result = self.execute(path)
+        self.results.append(result)
+        return result
+
+    @abstractmethod
+    def execute(self, path: Path) -> SampleResult:
+        """Run a single sample and wait for it to finish.
+
+        :param Path path: The path to the sample
+        :returns: The result of the run
+        :rtype: SampleResult
+        """
+
+    def summary(self) -> List[str]:
+        """Lines describing the runner itself, shown at the end of the session."""
+        return []
+
+    def close(self) -> None:
+        """Release any resources held by the runner."""
+
+
+class InProcessRunner(SampleRunner):
+    """Runs samples one at a time inside of the pytest process.
+
+    Exceptions raised by the sample propagate to pytest unchanged.
+    """
+
+    def execute(self, path: Path) -> SampleResult:
+        metrics: Dict[str, float] = {}
+        run_sample(path, metrics)
+        return SampleResult(path=path, passed=True, metrics=metrics)
+
+
+class ConcurrentRunner(SampleRunner):
+    """Base class for runners that hand samples to an executor.
+
+    Every prepared sample is submitted up front, so the wall-clock time of the suite approaches
+    that of the slowest sample. Results are still handed back to pytest in collection order,
+    which keeps reporting deterministic.
+    """
+
+    def __init__(self, executor: Executor) -> None:
+        super().__init__()
+        self.executor = executor
+        self.pending: Dict[Path, Future] = {}
+
+    @abstractmethod
+    def submit(self, path: Path) -> "Future[SampleResult]":
+        """Submit a sample to the executor
+
+        :param Path path: The path to the sample
+        :returns: A future for the result of the run
+        :rtype: Future[SampleResult]
+        """
+
+    def prepare(self, paths: Iterable[Path]) -> None:
+        for path in paths:
+            if path not in self.pending:
+                self.pending[path] = self.submit(path)
+
+    def execute(self, path: Path) -> SampleResult:
+        future = self.pending.pop(path, None) or self.submit(path)
+        return future.result()
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        self.pending.clear()
+
+
+class ProcessPoolRunner(ConcurrentRunner):
+    """Runs samples concurrently on a pool of long-lived worker processes."""
+
+    def __init__(self, workers: int) -> None:
+        # "spawn" avoids forking a pytest process that may already be running threads
+        super().__init__(ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")))
+
+    def submit(self, path: Path) -> "Future[SampleResult]":
+        return self.executor.submit(run_sample_captured, path)
+
+
+class SubprocessRunner(ConcurrentRunner):
+    """Runs every sample in a fresh child interpreter.
+
+    Samples can't leak imported modules or global state into each other, a sample that hangs is
+    killed once `timeout` expires, and the CPU time and peak RSS of the child are recorded.
+    Up to `workers` children run at the same time.
+    """
+
+    def __init__(self, workers: int = 1, timeout: Optional[float] = None) -> None:
+        super().__init__(ThreadPoolExecutor(max_workers=max(workers, 1)))
+        self.timeout = timeout
+
+    def submit(self, path: Path) -> "Future[SampleResult]":
+        return self.executor.submit(self.run_child, path)
+
+    def run_child(self, path: Path) -> SampleResult:
+        """Run a sample in a child interpreter and wait for it to exit
+
+        :param Path path: The path to the sample
+        :returns: The result of the run
+        :rtype: SampleResult
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            report_path = Path(tmp, "report.json")
+            start = time.perf_counter()
+            proc = subprocess.Popen(
+                [sys.executable, "-m", "pytest_sample_runner.child", str(path), str(report_path)],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+                env={**os.environ, "PYTHONUNBUFFERED": "1"},
+            )
+
+            try:
+                output, _ = proc.communicate(timeout=self.timeout)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                output, _ = proc.communicate()
+                return SampleResult(
+                    path=path,
+                    passed=False,
+                    output=output,
+                    error=f"Timed out after {self.timeout}s",
+                    wall_time=time.perf_counter() - start,
+                )
+
+            wall_time = time.perf_counter() - start
+
+            try:
+                report = json.loads(report_path.read_text())
+            except (OSError, ValueError):
+                # The child died before it could write a report (e.g. it was killed by a signal)
+                report = {"error": f"Sample interpreter exited with code {proc.returncode}"}
+
+        return SampleResult(
+            path=path,
+            passed=report.get("error") is None,
+            output=output,
+            error=report.get("error"),
+            wall_time=wall_time,
+            cpu_time=report.get("cpu_time"),
+            max_rss=report.get("max_rss"),
+            import_time=report.get("import_time"),
+            metrics=report.get("metrics") or {},
+        )
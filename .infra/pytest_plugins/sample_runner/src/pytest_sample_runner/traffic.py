@@ -0,0 +1,124 @@
+"""Control and measure the HTTP traffic of a sample
+
+A sample's traffic is either left alone, recorded to or replayed from a cassette (see `cassette`),
+or redirected to a local Agents service stand-in (see `fake_agents`). Whenever it is recorded,
+replayed or redirected, the requests the sample makes are also counted.
+
+Like cassettes, redirection is configured through environment variables so that it reaches
+samples running in worker processes.
+"""
+
+import os
+import re
+from contextlib import ExitStack, contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+from urllib.parse import urlsplit, urlunsplit
+
+from .cassette import cassette_for
+from .patching import offline_credentials, patched, patched_environment
+
+STAND_IN_ENV = "SAMPLE_STAND_IN_URL"
+"""The base URL of the Agents service stand-in that sample traffic is redirected to"""
+
+STAND_IN_ENVIRONMENT = {
+    "PROJECT_ENDPOINT": "https://stand-in.services.ai.azure.com/api/projects/stand-in",
+    "MODEL_DEPLOYMENT_NAME": "stand-in-model",
+}
+"""Defaults for the environment variables the samples require, used while redirected"""
+
+POLL_PATTERN = re.compile(r"/threads/[^/]+/runs/[^/]+$")
+"""Matches the path of a request that reads the status of a run"""
+
+
+@dataclass
+class TrafficStats:
+    """Counts the HTTP traffic of a sample"""
+
+    requests: int = 0
+    polls: int = 0
+    """`GET` requests for the status of a run"""
+    bytes_sent: int = 0
+    bytes_received: int = 0
+    """Going by the `Content-Length` of responses, so streamed responses aren't counted"""
+
+    def as_dict(self) -> Dict[str, float]:
+        return {k: float(v) for k, v in asdict(self).items()}
+
+
+@contextmanager
+def counting(stats: TrafficStats) -> Iterator[TrafficStats]:
+    """Count the requests sent through `requests` within the block"""
+    from requests.adapters import HTTPAdapter
+
+    original_send = HTTPAdapter.send
+
+    def send(adapter: HTTPAdapter, request: Any, *args: Any, **kwargs: Any) -> Any:
+        response = original_send(adapter, request, *args, **kwargs)
+
+        stats.requests += 1
+        stats.polls += request.method == "GET" and POLL_PATTERN.search(urlsplit(request.url).path) is not None
+        stats.bytes_sent += body_size(request.body)
+        stats.bytes_received += int(response.headers.get("content-length") or 0)
+        return response
+
+    with patched(HTTPAdapter, "send", send):
+        yield stats
+
+
+def body_size(body: Any) -> int:
+    """The size of a request body in bytes (0 for streamed bodies, whose size isn't known up front)"""
+    if isinstance(body, str):
+        return len(body.encode("utf-8"))
+    if isinstance(body, (bytes, bytearray)):
+        return len(body)
+    return 0
+
+
+@contextmanager
+def redirecting(url: str) -> Iterator[None]:
+    """Send all traffic to the stand-in at `url` within the block, whatever host it was addressed to
+
+    The sample's endpoint keeps its `https` scheme (which the SDKs insist on when sending a token),
+    only the connection goes to the stand-in.
+    """
+    from requests.adapters import HTTPAdapter
+
+    original_send = HTTPAdapter.send
+    target = urlsplit(url)
+
+    def send(adapter: HTTPAdapter, request: Any, *args: Any, **kwargs: Any) -> Any:
+        parts = urlsplit(request.url)
+        request.url = urlunsplit((target.scheme, target.netloc, parts.path, parts.query, parts.fragment))
+        return original_send(adapter, request, *args, **kwargs)
+
+    with ExitStack() as stack:
+        stack.enter_context(patched(HTTPAdapter, "send", send))
+        stack.enter_context(patched_environment(STAND_IN_ENVIRONMENT))
+        stack.enter_context(offline_credentials())
+        yield
+
+
+@contextmanager
+def sample_traffic(sample: Path) -> Iterator[Optional[TrafficStats]]:
+    """Record, replay or redirect a sample's traffic as configured by the environment
+
+    :param Path sample: The path to the sample
+    :returns: The traffic counts of the sample, or None if its traffic is left alone
+    :rtype: Iterator[Optional[TrafficStats]]
+    """
+    cassette = cassette_for(sample)
+    stand_in_url = os.environ.get(STAND_IN_ENV)
+
+    if cassette is None and not stand_in_url:
+        yield None
+        return
+
+    with ExitStack() as stack:
+        if cassette is not None:
+            stack.enter_context(cassette)
+        if stand_in_url:
+            stack.enter_context(redirecting(stand_in_url))
+
+        yield stack.enter_context(counting(TrafficStats()))
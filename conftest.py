@@ -12,15 +12,38 @@
 #   Pytest sees.  We accept the file if:
 #     – it ends with .py
 #     – its path is under SAMPLE_ROOT (any depth)
-# • Accepted files become SampleItem objects, which simply execute
-#   the script with runpy.run_path().
+#   Both checks are lookups in a collection index: one walk of the
+#   tree that lists the samples, and the directories leading to a
+#   sample or a notebook (which pytest-iovis collects).  Every other
+#   directory (infrastructure-setup, csharp, java, ...) is pruned in
+#   pytest_ignore_collect().  The index is kept in the pytest cache
+#   and rebuilt when the mtime of any directory changes.
+# • Accepted files become SampleItem objects, which hand the script
+#   to the runner provided by the pytest-sample-runner plugin
+#   (.infra/pytest_plugins/sample_runner).  By default the runner
+#   executes it in-process, like runpy.run_path(); --sample-workers
+#   runs samples concurrently on a pool of worker processes, and
+#   --sample-isolation runs each one in a fresh interpreter (with an
+#   optional --sample-timeout) and records its resource usage, and
+#   --sample-fork-server forks each one from a warm interpreter.
+# • The wall time of every sample is kept in the pytest cache
+#   (.pytest_cache), and samples are handed to the runner longest
+#   first (by the median of their recent durations), so that slow
+#   samples don't start last and stretch out a parallel run.
 #
 # Edit SAMPLE_ROOT if you move the samples elsewhere.
 
+import fnmatch
+import os
 import pathlib
-import runpy
+import statistics
+import time
+
 import pytest
 
+from pytest_sample_runner.plugin import get_runner
+from pytest_sample_runner.runners import SampleError
+
 # Root directory that contains all Python samples
 SAMPLE_ROOT = (
     pathlib.Path(__file__).parent
@@ -29,6 +52,20 @@ SAMPLE_ROOT = (
     / "python"
 ).resolve()
 
+# Directory walked by the collection index (the one holding this file)
+INDEX_ROOT = pathlib.Path(__file__).parent.resolve()
+# pytest cache key of the collection index
+SAMPLE_INDEX_CACHE_KEY = "samples/index"
+
+# pytest cache key of the recent wall times of every sample, keyed by
+# the sample's path relative to the rootdir
+DURATIONS_CACHE_KEY = "samples/durations"
+# Number of recent wall times kept per sample
+DURATION_HISTORY_LENGTH = 5
+
+_durations_key = pytest.StashKey[dict]()
+_index_key = pytest.StashKey[dict]()
+
 
 def _is_under_sample_root(path_obj: pathlib.Path) -> bool:
     """
@@ -43,15 +80,184 @@ def _is_under_sample_root(path_obj: pathlib.Path) -> bool:
         return False
 
 
+def _cache(config):
+    # Missing, rather than None, when run with `-p no:cacheprovider`
+    return getattr(config, "cache", None)
+
+
+def _is_within(path, directory):
+    return path == directory or path.startswith(directory + os.sep)
+
+
+def _build_index(config):
+    """
+    Walk INDEX_ROOT once (skipping `norecursedirs`, like pytest does)
+    and record the samples, the directories that lead to something
+    collectable, and the mtime of every directory walked.
+    """
+    norecursedirs = config.getini("norecursedirs")
+    sample_root = str(SAMPLE_ROOT)
+    samples, keep, mtimes = [], {str(INDEX_ROOT)}, {}
+
+    for dirpath, dirnames, filenames in os.walk(INDEX_ROOT):
+        dirnames[:] = [d for d in dirnames if not any(fnmatch.fnmatch(d, p) for p in norecursedirs)]
+        mtimes[dirpath] = os.stat(dirpath).st_mtime_ns
+
+        found = []
+        if _is_within(dirpath, sample_root):
+            found = [os.path.join(dirpath, f) for f in filenames if f.endswith(".py")]
+            samples.extend(found)
+
+        if found or any(f.endswith(".ipynb") for f in filenames):
+            directory = dirpath
+            while directory not in keep:
+                keep.add(directory)
+                directory = os.path.dirname(directory)
+
+    return {
+        "sample_root": sample_root,
+        "norecursedirs": norecursedirs,
+        "mtimes": mtimes,
+        "samples": samples,
+        "dirs": sorted(keep),
+    }
+
+
+def _index_is_fresh(config, index):
+    if index.get("sample_root") != str(SAMPLE_ROOT):
+        return False
+    if index.get("norecursedirs") != config.getini("norecursedirs"):
+        return False
+
+    try:
+        return all(os.stat(d).st_mtime_ns == mtime for d, mtime in index["mtimes"].items())
+    except OSError:
+        return False
+
+
+def _sample_index(config):
+    """
+    Get the collection index, from the pytest cache if no directory
+    has changed since it was built.
+    """
+    if _index_key in config.stash:
+        return config.stash[_index_key]
+
+    cache = _cache(config)
+    index = cache.get(SAMPLE_INDEX_CACHE_KEY, None) if cache is not None else None
+
+    if index is None or not _index_is_fresh(config, index):
+        index = _build_index(config)
+        if cache is not None:
+            cache.set(SAMPLE_INDEX_CACHE_KEY, index)
+
+    config.stash[_index_key] = {
+        "mtimes": index["mtimes"],
+        "samples": frozenset(index["samples"]),
+        "dirs": frozenset(index["dirs"]),
+    }
+    return config.stash[_index_key]
+
+
+def _is_sample(config, path_obj):
+    """
+    Return True if `path_obj` is a sample.  Paths within INDEX_ROOT are
+    looked up in the index; anything else (e.g. reached through a
+    symlink) falls back to resolving the path.
+    """
+    path = str(path_obj)
+
+    if path in _sample_index(config)["samples"]:
+        return True
+    if _is_within(path, str(INDEX_ROOT)):
+        return False
+
+    return _is_under_sample_root(path_obj)
+
+
+def pytest_ignore_collect(collection_path, config):
+    """
+    PyTest collection hook: prune directories under INDEX_ROOT that
+    contain neither samples nor notebooks.  Returning None leaves the
+    decision to pytest and other plugins.
+    """
+    index = _sample_index(config)
+    path = str(collection_path)
+
+    if path in index["mtimes"] and path not in index["dirs"]:
+        return True
+
+    return None
+
+
 def pytest_collect_file(parent, path):
     """
     PyTest collection hook: decide whether *path* should become a test item.
     `path` is a py.path.local object; convert to Path for easier checks.
     """
-    if path.ext == ".py" and _is_under_sample_root(pathlib.Path(path)):
+    if path.ext == ".py" and _is_sample(parent.config, pathlib.Path(path)):
         return SampleItem.from_parent(parent, name=path.basename, fspath=path)
 
 
+def pytest_collection_finish(session):
+    """
+    Let the runner start on the samples that survived collection and
+    deselection (e.g. submit them all to the worker pool up front).
+    """
+    if session.config.option.collectonly:
+        return
+
+    # Items marked to be skipped (e.g. cached passes) are never run, so don't start them either
+    paths = [
+        pathlib.Path(item.fspath)
+        for item in session.items
+        if isinstance(item, SampleItem) and item.get_closest_marker("skip") is None
+    ]
+    get_runner(session.config).prepare(_longest_first(session.config, paths))
+
+
+def pytest_sessionfinish(session):
+    """
+    Add the wall times measured in this session to the duration history.
+    """
+    durations = session.config.stash.get(_durations_key, None)
+    cache = _cache(session.config)
+    if not durations or cache is None:
+        return
+
+    history = cache.get(DURATIONS_CACHE_KEY, {})
+    for key, duration in durations.items():
+        history[key] = (history.get(key, []) + [duration])[-DURATION_HISTORY_LENGTH:]
+    cache.set(DURATIONS_CACHE_KEY, history)
+
+
+def _longest_first(config, paths):
+    """
+    Order samples by expected wall time, longest first (the LPT rule),
+    so that a pool of workers finishes them close to the same time.
+
+    Samples without history are assumed to be as slow as the slowest
+    known sample, so they also start early.  Ties keep collection order.
+    """
+    cache = _cache(config)
+    if cache is None:
+        return paths
+
+    history = cache.get(DURATIONS_CACHE_KEY, {})
+    keys = {p: _duration_key(config, p) for p in paths}
+    expected = {p: statistics.median(history[key]) for p, key in keys.items() if history.get(key)}
+    unknown = max(expected.values(), default=0.0)
+
+    return sorted(paths, key=lambda p: -expected.get(p, unknown))
+
+
+def _duration_key(config, path):
+    try:
+        return path.resolve().relative_to(config.rootpath).as_posix()
+    except ValueError:
+        return path.resolve().as_posix()
+
+
 class SampleItem(pytest.Item):
     """
     Wrapper around an arbitrary Python script.
@@ -59,12 +265,42 @@ class SampleItem(pytest.Item):
     """
 
     def runtest(self):
-        # Execute the script in its own namespace.
-        runpy.run_path(str(self.fspath))
+        # Execute the script in its own namespace (possibly in another process).
+        path = pathlib.Path(self.fspath)
+        start = time.perf_counter()
+        result = get_runner(self.config).run(path)
+        self.result = result
+
+        # Concurrent runners measure the sample itself, rather than the wait for it
+        duration = result.wall_time if result.wall_time is not None else time.perf_counter() - start
+        self.config.stash.setdefault(_durations_key, {})[_duration_key(self.config, path)] = duration
+
+        if result.wall_time is not None:
+            self.user_properties.append(("wall_time", result.wall_time))
+        if result.cpu_time is not None:
+            self.user_properties.append(("cpu_time", result.cpu_time))
+        if result.max_rss is not None:
+            self.user_properties.append(("max_rss", result.max_rss))
+
+        # Shown with the output of passing samples too (e.g. `-rP`), so slow or memory-heavy ones stand out
+        resources = result.describe_resources()
+        if resources:
+            self.add_report_section("call", "resources", resources)
+
+        if result.output:
+            self.add_report_section("call", "sample output", result.output)
+
+        if not result.passed:
+            raise SampleError(result)
 
     def repr_failure(self, excinfo):
         # Nicely format any exception raised during runtest().
-        return f"Sample {self.fspath} failed:\n{excinfo.value}"
+        resources = self._describe_resources()
+        return f"Sample {self.fspath} failed{f' ({resources})' if resources else ''}:\n{excinfo.value}"
 
     def reportinfo(self):
         return self.fspath, 0, "sample script"
+
+    def _describe_resources(self):
+        result = getattr(self, "result", None)
+        return result.describe_resources() if result is not None else ""
@@ -21,11 +21,17 @@ USAGE:
        the "Models + endpoints" tab in your Azure AI Foundry project.
 """
 
-import os, time
+import os, sys
+from pathlib import Path
 from azure.ai.agents import AgentsClient
 from azure.identity import DefaultAzureCredential
 from azure.ai.agents.models import ListSortOrder, MessageTextContent
 from dotenv import load_dotenv
+
+# RunWaiter, in run_polling.py next to the samples in the parent directory, polls runs with backoff
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from run_polling import RunWaiter
+
 load_dotenv()
 
 # [START create_project_client]
@@ -59,13 +65,11 @@ with agents_client:
     # [START create_run]
     run = agents_client.create_run(thread_id=thread.id, agent_id=agent.id)
 
-    # Poll the run as long as run status is queued or in progress
-    while run.status in ["queued", "in_progress", "requires_action"]:
-        # Wait for a second
-        time.sleep(1)
-        run = agents_client.get_run(thread_id=thread.id, run_id=run.id)
-        # [END create_run]
-        print(f"Run status: {run.status}")
+    # Poll the run, with backoff, as long as run status is queued or in progress
+    waiter = RunWaiter()
+    run = waiter.wait(agents_client.get_run, thread_id=thread.id, run_id=run.id)
+    # [END create_run]
+    print(f"Run status: {run.status} ({waiter.summary()})")
 
     agents_client.delete_agent(agent.id)
     print("Deleted agent")
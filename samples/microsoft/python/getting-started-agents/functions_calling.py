@@ -21,10 +21,11 @@ USAGE:
        the "Models + endpoints" tab in your Azure AI Foundry project.
 """
 # Import necessary modules
-import os, time
+import os
 from azure.identity import DefaultAzureCredential
 from azure.ai.projects import AIProjectClient  # Import AIProjectClient for consistency
 from azure.ai.agents.models import FunctionTool, RequiredFunctionToolCall, SubmitToolOutputsAction, ToolOutput
+from run_polling import RunWaiter  # Polls runs with backoff instead of once a second
 
 # Retrieve the project endpoint from environment variables
 project_endpoint = os.environ["PROJECT_ENDPOINT"]
@@ -62,52 +63,53 @@ with project_client:
     )
     print(f"Created message, ID: {message['id']}")
 
-    # Create and process a run for the agent to handle the message
-    run = project_client.agents.runs.create_and_process(thread_id=thread.id, agent_id=agent.id)
+    # Create a run for the agent to handle the message
+    run = project_client.agents.runs.create(thread_id=thread.id, agent_id=agent.id)
     print(f"Created run, ID: {run.id}")
 
-    # Poll the run status until it is completed or requires action
-    while run.status in ["queued", "in_progress", "requires_action"]:
-        time.sleep(1)  # Wait for 1 second before checking the status again
-        run = project_client.agents.runs.get(thread_id=thread.id, run_id=run.id)
-
-        # Handle cases where the run requires action
-        if run.status == "requires_action" and isinstance(run.required_action, SubmitToolOutputsAction):
-            tool_calls = run.required_action.submit_tool_outputs.tool_calls
-            if not tool_calls:
-                # Cancel the run if no tool calls are provided
-                print("No tool calls provided - cancelling run")
-                project_client.agents.runs.cancel(thread_id=thread.id, run_id=run.id)
-                break
-
-            tool_outputs = []
-            for tool_call in tool_calls:
-                if isinstance(tool_call, RequiredFunctionToolCall):
-                    try:
-                        # Execute the tool call and collect the output
-                        print(f"Executing tool call: {tool_call}")
-                        output = functions.execute(tool_call)
-                        tool_outputs.append(
-                            ToolOutput(
-                                tool_call_id=tool_call.id,  # ID of the tool call
-                                output=output,  # Output of the tool call
-                            )
+    # Wait for the run to complete or require action, polling its status with backoff
+    waiter = RunWaiter()
+    run = waiter.wait(project_client.agents.runs.get, thread_id=thread.id, run_id=run.id)
+
+    # Handle the tool calls the run requires, until it no longer requires action
+    while run.status == "requires_action" and isinstance(run.required_action, SubmitToolOutputsAction):
+        tool_calls = run.required_action.submit_tool_outputs.tool_calls
+        if not tool_calls:
+            # Cancel the run if no tool calls are provided
+            print("No tool calls provided - cancelling run")
+            project_client.agents.runs.cancel(thread_id=thread.id, run_id=run.id)
+            break
+
+        tool_outputs = []
+        for tool_call in tool_calls:
+            if isinstance(tool_call, RequiredFunctionToolCall):
+                try:
+                    # Execute the tool call and collect the output
+                    print(f"Executing tool call: {tool_call}")
+                    output = functions.execute(tool_call)
+                    tool_outputs.append(
+                        ToolOutput(
+                            tool_call_id=tool_call.id,  # ID of the tool call
+                            output=output,  # Output of the tool call
                         )
-                    except Exception as e:
-                        # Log any errors encountered during tool execution
-                        print(f"Error executing tool_call {tool_call.id}: {e}")
-
-            print(f"Tool outputs: {tool_outputs}")
-            if tool_outputs:
-                # Submit the tool outputs back to the agent
-                project_client.agents.runs.submit_tool_outputs(
-                    thread_id=thread.id, run_id=run.id, tool_outputs=tool_outputs
-                )
+                    )
+                except Exception as e:
+                    # Log any errors encountered during tool execution
+                    print(f"Error executing tool_call {tool_call.id}: {e}")
+
+        print(f"Tool outputs: {tool_outputs}")
+        if tool_outputs:
+            # Submit the tool outputs back to the agent
+            project_client.agents.runs.submit_tool_outputs(
+                thread_id=thread.id, run_id=run.id, tool_outputs=tool_outputs
+            )
 
         print(f"Current run status: {run.status}")
+        # Wait for the run to process the tool outputs
+        run = waiter.wait(project_client.agents.runs.get, thread_id=thread.id, run_id=run.id)
 
-    # Log the final status of the run
-    print(f"Run completed with status: {run.status}")
+    # Log the final status of the run, and how often it was polled
+    print(f"Run completed with status: {run.status} ({waiter.summary()})")
 
     # Delete the agent after the interaction is complete
     project_client.agents.delete_agent(agent.id)
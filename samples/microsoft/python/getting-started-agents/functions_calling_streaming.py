@@ -0,0 +1,219 @@
+# ------------------------------------
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+# ------------------------------------
+
+"""
+DESCRIPTION:
+    This sample demonstrates how to use agent operations with custom functions from
+    the Azure Agents service, streaming the run's events instead of polling its status.
+
+    The run is created with a stream of server-sent events. The agent's reply is printed
+    as it is generated, and when the run requires action the functions are executed and
+    their outputs submitted as soon as they are requested, on a new stream that the same
+    event handler keeps reading. No request is spent checking on the run.
+
+USAGE:
+    python functions_calling_streaming.py
+
+    Before running the sample:
+
+    pip install azure-ai-agents azure-identity
+
+    Set these environment variables with your own values:
+    1) PROJECT_ENDPOINT - the Azure AI Agents endpoint.
+    2) MODEL_DEPLOYMENT_NAME - The deployment name of the AI model, as found under the "Name" column in
+       the "Models + endpoints" tab in your Azure AI Foundry project.
+"""
+# Import necessary modules
+import datetime
+import json
+import os
+import time
+from typing import Any, Callable, Optional, Set
+from azure.identity import DefaultAzureCredential
+from azure.ai.projects import AIProjectClient  # Import AIProjectClient for consistency
+from azure.ai.agents.models import (
+    AgentEventHandler,
+    FunctionTool,
+    MessageDeltaChunk,
+    RequiredFunctionToolCall,
+    SubmitToolOutputsAction,
+    ThreadMessage,
+    ThreadRun,
+    ToolOutput,
+)
+
+
+# These are the user-defined functions that can be called by the agent.
+def fetch_current_datetime(format: Optional[str] = None) -> str:
+    """
+    Get the current time as a JSON string, optionally formatted.
+
+    :param format (Optional[str]): The format in which to return the current time. Defaults to None, which uses a standard format.
+    :return: The current time in JSON format.
+    :rtype: str
+    """
+    current_time = datetime.datetime.now()
+    time_format = format or "%Y-%m-%d %H:%M:%S"
+    return json.dumps({"current_time": current_time.strftime(time_format)})
+
+
+def fetch_weather(location: str) -> str:
+    """
+    Fetches the weather information for the specified location.
+
+    :param location (str): The location to fetch weather for.
+    :return: Weather information as a JSON string.
+    :rtype: str
+    """
+    # In a real-world scenario, you'd integrate with a weather API.
+    # Here, we'll mock the response.
+    mock_weather_data = {"New York": "Sunny, 25°C", "London": "Cloudy, 18°C", "Tokyo": "Rainy, 22°C"}
+    weather = mock_weather_data.get(location, "Weather data not available for this location.")
+    return json.dumps({"weather": weather})
+
+
+def send_email(recipient: str, subject: str, body: str) -> str:
+    """
+    Sends an email with the specified subject and body to the recipient.
+
+    :param recipient (str): Email address of the recipient.
+    :param subject (str): Subject of the email.
+    :param body (str): Body content of the email.
+    :return: Confirmation message.
+    :rtype: str
+    """
+    # In a real-world scenario, you'd use an SMTP server or an email service API.
+    # Here, we'll mock the email sending.
+    print(f"Sending email to {recipient}...")
+    print(f"Subject: {subject}")
+    print(f"Body:\n{body}")
+    return json.dumps({"message": f"Email successfully sent to {recipient}."})
+
+
+user_functions: Set[Callable[..., Any]] = {fetch_current_datetime, fetch_weather, send_email}
+
+
+class FunctionCallingEventHandler(AgentEventHandler):
+    """Prints the agent's reply as it streams in, and submits the outputs of the functions it calls"""
+
+    def __init__(self, runs: Any, functions: FunctionTool) -> None:
+        """
+        :param runs: The run operations of the client, i.e. `project_client.agents.runs`
+        :param functions: The functions the agent can call
+        """
+        super().__init__()
+        self.runs = runs
+        self.functions = functions
+        self.started = time.monotonic()
+        self.round_trips = 1  # The request that created the run
+        self.time_to_first_token: Optional[float] = None
+
+    def on_message_delta(self, delta: MessageDeltaChunk) -> None:
+        # Record how long the first piece of the reply took to arrive, then print each piece
+        if self.time_to_first_token is None:
+            self.time_to_first_token = time.monotonic() - self.started
+        print(delta.text, end="", flush=True)
+
+    def on_thread_message(self, message: ThreadMessage) -> None:
+        # End the line of the reply once the message is complete
+        if message.status == "completed":
+            print()
+
+    def on_thread_run(self, run: ThreadRun) -> None:
+        print(f"Run status: {run.status}")
+
+        if run.status == "failed":
+            print(f"Run failed. Error: {run.last_error}")
+
+        if run.status != "requires_action" or not isinstance(run.required_action, SubmitToolOutputsAction):
+            return
+
+        tool_calls = run.required_action.submit_tool_outputs.tool_calls
+        if not tool_calls:
+            # Cancel the run if no tool calls are provided
+            print("No tool calls provided - cancelling run")
+            self.runs.cancel(thread_id=run.thread_id, run_id=run.id)
+            return
+
+        tool_outputs = []
+        for tool_call in tool_calls:
+            if isinstance(tool_call, RequiredFunctionToolCall):
+                try:
+                    # Execute the tool call and collect the output
+                    print(f"Executing tool call: {tool_call}")
+                    output = self.functions.execute(tool_call)
+                    tool_outputs.append(
+                        ToolOutput(
+                            tool_call_id=tool_call.id,  # ID of the tool call
+                            output=output,  # Output of the tool call
+                        )
+                    )
+                except Exception as e:
+                    # Log any errors encountered during tool execution
+                    print(f"Error executing tool_call {tool_call.id}: {e}")
+
+        print(f"Tool outputs: {tool_outputs}")
+        if tool_outputs:
+            # Submit the tool outputs right away; the events that follow are read by this same handler
+            self.round_trips += 1
+            self.runs.submit_tool_outputs_stream(
+                thread_id=run.thread_id, run_id=run.id, tool_outputs=tool_outputs, event_handler=self
+            )
+
+
+# Retrieve the project endpoint from environment variables
+project_endpoint = os.environ["PROJECT_ENDPOINT"]
+
+# Initialize the AIProjectClient with the endpoint and credentials
+project_client = AIProjectClient(
+    endpoint=project_endpoint,  # Azure AI Agents endpoint
+    credential=DefaultAzureCredential(),  # Use Azure Default Credential for authentication
+    api_version="latest",  # Use the latest API version
+)
+
+# Initialize the FunctionTool with user-defined functions
+functions = FunctionTool(functions=user_functions)
+
+# Use the project client within a context manager to ensure proper resource cleanup
+with project_client:
+    # Create an agent with custom functions
+    agent = project_client.agents.create_agent(
+        model=os.environ["MODEL_DEPLOYMENT_NAME"],  # Model deployment name from environment variables
+        name="my-agent",  # Name of the agent
+        instructions="You are a helpful agent",  # Instructions for the agent
+        tools=functions.definitions,  # Attach the function tool definitions to the agent
+    )
+    print(f"Created agent, ID: {agent.id}")
+
+    # Create a new thread for communication with the agent
+    thread = project_client.agents.threads.create()
+    print(f"Created thread, ID: {thread.id}")
+
+    # Create a user message in the thread
+    message = project_client.agents.messages.create(
+        thread_id=thread.id,  # ID of the thread
+        role="user",  # Role of the message sender
+        content="Hello, send an email with the datetime and weather information in New York?",  # Message content
+    )
+    print(f"Created message, ID: {message['id']}")
+
+    # Create a run and stream its events until it is done, handling tool calls as they are requested
+    handler = FunctionCallingEventHandler(project_client.agents.runs, functions)
+    with project_client.agents.runs.stream(thread_id=thread.id, agent_id=agent.id, event_handler=handler) as stream:
+        stream.until_done()
+
+    # Log how many requests the run took, and how soon the reply started to arrive
+    if handler.time_to_first_token is not None:
+        print(f"First token after {handler.time_to_first_token:.2f}s")
+    print(f"Run finished in {handler.round_trips} round trips")
+
+    # Delete the agent after the interaction is complete
+    project_client.agents.delete_agent(agent.id)
+    print("Deleted agent")
+
+    # Fetch and log all messages from the thread
+    messages = project_client.agents.messages.list(thread_id=thread.id)
+    for message in messages:
+        print(f"Role: {message['role']}, Content: {message['content']}")
@@ -1,10 +1,10 @@
-import time
 import json
 
 from azure.ai.agents import AgentsClient
 from azure.ai.agents.models import MessageTextContent, ListSortOrder
 from azure.ai.projects import AIProjectClient
 from azure.identity import DefaultAzureCredential
+from run_polling import RunWaiter
 
 
 project_client = AIProjectClient(
@@ -39,12 +39,10 @@ with project_client:
 
     run = project_client.agents.runs.create(thread_id=thread.id, agent_id=agent.id)
 
-    # Poll the run as long as run status is queued or in progress
-    while run.status in ["queued", "in_progress", "requires_action"]:
-        # Wait for a second
-        time.sleep(1)
-        run = project_client.agents.runs.get(thread_id=thread.id, run_id=run.id)
-        print(f"Run status: {run.status}")
+    # Poll the run, with backoff, as long as run status is queued or in progress
+    waiter = RunWaiter()
+    run = waiter.wait(project_client.agents.runs.get, thread_id=thread.id, run_id=run.id)
+    print(f"Run status: {run.status} ({waiter.summary()})")
 
     if run.status == "failed":
         print(f"Run error: {run.last_error}")
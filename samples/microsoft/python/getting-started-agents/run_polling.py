@@ -0,0 +1,147 @@
+# ------------------------------------
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+# ------------------------------------
+
+"""
+DESCRIPTION:
+    A helper used by the samples to wait for an agent run, instead of checking its
+    status once a second.
+
+    RunWaiter checks the run soon after it was created, then backs off exponentially
+    (with jitter, so that many clients don't poll in lockstep) up to a maximum delay.
+    When the service says how long to wait, with a `retry-after-ms`, `x-ms-retry-after-ms`
+    or `Retry-After` header, that hint is used instead. Short runs are noticed sooner, and
+    long runs are polled far less often than with a fixed one-second sleep.
+
+USAGE:
+    from run_polling import RunWaiter
+
+    waiter = RunWaiter()
+    run = waiter.wait(project_client.agents.runs.get, thread_id=thread.id, run_id=run.id)
+    print(f"Run finished with status: {run.status} ({waiter.summary()})")
+"""
+
+import random
+import time
+from typing import Any, Callable, Mapping, Optional, Tuple
+
+from azure.core.exceptions import HttpResponseError
+
+PENDING_STATUSES = ("queued", "in_progress", "cancelling")
+"""Run statuses that change without any action from the client"""
+
+THROTTLED_STATUS_CODES = (429, 503)
+"""Status codes of responses that mean "try again later" """
+
+
+class RunWaiter:
+    """
+    Polls an agent run with exponential backoff and jitter until it needs the client
+    (e.g. it requires action) or has finished, and counts the polls it makes.
+    """
+
+    def __init__(
+        self,
+        first_delay: float = 0.25,
+        max_delay: float = 5.0,
+        multiplier: float = 1.6,
+        jitter: float = 0.2,
+        timeout: Optional[float] = None,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        """
+        :param first_delay: Seconds to wait before the first check
+        :param max_delay: The longest wait between two checks, unless the service asks for longer
+        :param multiplier: How much longer each wait is than the previous one
+        :param jitter: How much each wait varies at random, as a fraction of it
+        :param timeout: Seconds after which to give up waiting (raising a TimeoutError), if any
+        :param sleep: The function used to wait
+        """
+        self.first_delay = first_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self.timeout = timeout
+        self.sleep = sleep
+
+        self.polls = 0
+        """The number of times the run's status was read, over all waits"""
+        self.elapsed = 0.0
+        """Seconds spent waiting, over all waits"""
+        self.waits = 0
+
+    def wait(self, get_run: Callable[..., Any], **kwargs: Any) -> Any:
+        """
+        Waits until a run is no longer queued, in progress or cancelling.
+
+        :param get_run: The SDK operation that gets the run, e.g. `project_client.agents.runs.get`
+        :param kwargs: The arguments of `get_run`, e.g. `thread_id` and `run_id`
+        :return: The run, as last read
+        """
+        started = time.monotonic()
+        backoff = self.first_delay
+        delay = self._vary(backoff)
+        self.waits += 1
+
+        try:
+            while True:
+                hint = None
+                self.sleep(delay)
+
+                try:
+                    run, hint = get_run(**kwargs, cls=_with_retry_after)
+                except HttpResponseError as e:
+                    # Throttled, even after the SDK's own retries: wait as long as the service asks
+                    if e.status_code not in THROTTLED_STATUS_CODES or e.response is None:
+                        raise
+                    hint = retry_after(e.response.headers)
+                    run = None
+                finally:
+                    self.polls += 1
+
+                if run is not None and run.status not in PENDING_STATUSES:
+                    return run
+
+                waited = time.monotonic() - started
+                if self.timeout is not None and waited >= self.timeout:
+                    raise TimeoutError(f"Run still pending after {waited:.1f}s ({self.polls} polls)")
+
+                backoff = min(backoff * self.multiplier, self.max_delay)
+                delay = hint if hint is not None else self._vary(backoff)
+                if self.timeout is not None:
+                    delay = min(delay, self.timeout - waited)
+        finally:
+            self.elapsed += time.monotonic() - started
+
+    def summary(self) -> str:
+        """Describes the polls made so far, e.g. "4 polls over 1 wait in 2.31s" """
+        return f"{self.polls} polls over {self.waits} wait{'s' if self.waits != 1 else ''} in {self.elapsed:.2f}s"
+
+    def _vary(self, delay: float) -> float:
+        return max(0.0, delay * (1 + random.uniform(-self.jitter, self.jitter)))
+
+
+def retry_after(headers: Mapping[str, str]) -> Optional[float]:
+    """
+    Reads how long the service asks the client to wait from response headers.
+
+    :param headers: The response headers
+    :return: The delay in seconds, or None if there is no (valid) hint
+    """
+    for name, scale in (("retry-after-ms", 0.001), ("x-ms-retry-after-ms", 0.001), ("retry-after", 1.0)):
+        value = headers.get(name)
+        if value is None:
+            continue
+        try:
+            return max(0.0, float(value) * scale)
+        except ValueError:
+            # An HTTP date rather than a number of seconds
+            continue
+
+    return None
+
+
+def _with_retry_after(pipeline_response: Any, deserialized: Any, _headers: Any) -> Tuple[Any, Optional[float]]:
+    # Passed as `cls` to an SDK operation, so that the response headers can be read
+    return deserialized, retry_after(pipeline_response.http_response.headers)